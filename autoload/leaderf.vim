@@ -79,6 +79,11 @@ call s:InitVar('g:Lf_FollowLinks', 0)
 call s:InitVar('g:Lf_DelimiterChar', ';')
 call s:InitVar('g:Lf_MruFileExclude', [])
 call s:InitVar('g:Lf_MruMaxFiles', 100)
+call s:InitVar('g:Lf_FrecencyWeight', 2)
+call s:InitVar('g:Lf_FuzzyProcessCount', 0)
+call s:InitVar('g:Lf_FuzzyEngineThreads', 0)
+call s:InitVar('g:Lf_FuzzyEngineAffinity', 0)
+call s:InitVar('g:Lf_Prewarm', 0)
 call s:InitVar('g:Lf_HighlightIndividual', 1)
 call s:InitVar('g:Lf_NumberOfHighlight', 100)
 call s:InitVar('g:Lf_WildIgnore', {
@@ -125,6 +130,9 @@ call s:InitDict('g:Lf_PreviewResult', {
 call s:InitDict('g:Lf_NormalMap', {})
 call s:InitVar('g:Lf_Extensions', {})
 call s:InitDict('g:Lf_CtagsFuncOpts', {})
+call s:InitVar('g:Lf_CtagsCacheSize', 50)
+call s:InitVar('g:Lf_Tracing', 0)
+call s:InitVar('g:Lf_TracingSize', 200)
 call s:InitDict('g:Lf_MaxCount', 2000000)
 
 let s:Lf_CommandMap = {
@@ -239,3 +247,11 @@ function! leaderf#LfPy(cmd)
     exec g:Lf_py . a:cmd
 endfunction
 
+
+" the options in the snapshot of leaderf/python/leaderf/config.py
+if exists('##OptionSet')
+    augroup LeaderF_Config
+        autocmd!
+        autocmd OptionSet encoding,ignorecase exec g:Lf_py "from leaderf.config import lfConfig; lfConfig.invalidate()"
+    augroup END
+endif
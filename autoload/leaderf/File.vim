@@ -38,6 +38,10 @@ function! leaderf#File#Maps()
     nnoremap <buffer> <silent> <PageUp>      <PageUp>:exec g:Lf_py "fileExplManager._previewResult(False)"<CR>
     nnoremap <buffer> <silent> <PageDown>    <PageDown>:exec g:Lf_py "fileExplManager._previewResult(False)"<CR>
     nnoremap <buffer> <silent> <LeftMouse>   <LeftMouse>:exec g:Lf_py "fileExplManager._previewResult(False)"<CR>
+    augroup Lf_File_Selections
+        autocmd! * <buffer>
+        autocmd CursorMoved <buffer> exec g:Lf_py "fileExplManager.updateSelections()"
+    augroup END
     if has_key(g:Lf_NormalMap, "File")
         for i in g:Lf_NormalMap["File"]
             exec 'nnoremap <buffer> <silent> '.i[0].' '.i[1]
@@ -58,6 +62,10 @@ function! leaderf#File#startExplPattern(win_pos, pattern)
     call leaderf#LfPy("fileExplManager.startExplorer('".a:win_pos."', pattern='".a:pattern."')")
 endfunction
 
+function! leaderf#File#prewarm()
+    call leaderf#LfPy("fileExplManager.prewarm(vim.current.buffer.name)")
+endfunction
+
 function! leaderf#File#cleanup()
     call leaderf#LfPy("fileExplManager._beforeExit()")
 endfunction
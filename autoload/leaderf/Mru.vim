@@ -38,6 +38,10 @@ function! leaderf#Mru#Maps()
     nnoremap <buffer> <silent> <PageUp>      <PageUp>:exec g:Lf_py "mruExplManager._previewResult(False)"<CR>
     nnoremap <buffer> <silent> <PageDown>    <PageDown>:exec g:Lf_py "mruExplManager._previewResult(False)"<CR>
     nnoremap <buffer> <silent> <LeftMouse>   <LeftMouse>:exec g:Lf_py "mruExplManager._previewResult(False)"<CR>
+    augroup Lf_Mru_Selections
+        autocmd! * <buffer>
+        autocmd CursorMoved <buffer> exec g:Lf_py "mruExplManager.updateSelections()"
+    augroup END
     if has_key(g:Lf_NormalMap, "Mru")
         for i in g:Lf_NormalMap["Mru"]
             exec 'nnoremap <buffer> <silent> '.i[0].' '.i[1]
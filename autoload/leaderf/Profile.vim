@@ -0,0 +1,27 @@
+" ============================================================================
+" File:        Profile.vim
+" Description:
+" Author:      Yggdroot <archofortune@gmail.com>
+" Website:     https://github.com/Yggdroot
+" Note:
+" License:     Apache License, Version 2.0
+" ============================================================================
+
+if leaderf#versionCheck() == 0  " this check is necessary
+    finish
+endif
+
+exec g:Lf_py "from leaderf.tracer import *"
+
+" :LeaderfProfile        show the traces
+" :LeaderfProfile {file} write the traces to {file} in Chrome trace format
+" :LeaderfProfile!       clear the traces
+function! leaderf#Profile#command(bang, file)
+    if a:bang
+        exec g:Lf_py "tracer.clear()"
+    elseif a:file != ''
+        call leaderf#LfPy("tracer.export(r'''".escape(a:file, "'")."''')")
+    else
+        exec g:Lf_py "tracer.show()"
+    endif
+endfunction
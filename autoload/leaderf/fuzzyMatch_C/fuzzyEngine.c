@@ -24,6 +24,11 @@
 #include <pthread.h>
 #endif
 
+#if defined(__linux__)
+#include <sched.h>
+#include <unistd.h>
+#endif
+
 #include "fuzzyEngine.h"
 #include "fuzzyMatch.h"
 
@@ -71,6 +76,7 @@ typedef struct FeCircularQueue
 struct FuzzyEngine
 {
     uint32_t        cpu_count;
+    uint8_t         affinity;
 #if defined(_MSC_VER)
     HANDLE*         threads;
 #else
@@ -79,6 +85,10 @@ struct FuzzyEngine
     PatternContext* pPattern_ctxt;
     uint8_t         is_name_only;
     FeString*       source;
+    PatternContext** pPattern_ctxts;    /* the sub-patterns of fuzzyMatchAll() */
+    uint32_t        pattern_count;
+    PatternContext* pPattern_ctxt2;     /* the pattern of `source2` of fuzzyMatchRefine() */
+    FeString*       source2;
     FeTaskItem*     tasks;
     union
     {
@@ -281,7 +291,9 @@ struct FuzzyEngine
 enum
 {
     GETWEIGHT = 0,
-    GETHIGHLIGHTS
+    GETHIGHLIGHTS,
+    GETWEIGHT_ALL,
+    GETWEIGHT_REFINE
 };
 
 #if defined(_MSC_VER)
@@ -311,6 +323,50 @@ static void* _worker(void* pParam)
                                            pEngine->pPattern_ctxt, pEngine->is_name_only);
                 }
             }
+            else if ( pTask->function == GETWEIGHT_ALL )
+            {
+                weight_t* results = pEngine->weights + pTask->offset;
+                uint32_t length = pTask->length;
+                uint32_t i = 0;
+                for ( ; i < length; ++i )
+                {
+                    weight_t sum = 0;
+                    uint32_t k = 0;
+                    for ( ; k < pEngine->pattern_count; ++k )
+                    {
+                        weight_t weight = getWeight(tasks[i].str, tasks[i].len,
+                                                    pEngine->pPattern_ctxts[k], pEngine->is_name_only);
+                        /* stop at the first sub-pattern that does not match */
+                        if ( weight <= MIN_WEIGHT )
+                        {
+                            sum = MIN_WEIGHT;
+                            break;
+                        }
+                        sum += weight;
+                    }
+                    results[i] = sum;
+                }
+            }
+            else if ( pTask->function == GETWEIGHT_REFINE )
+            {
+                FeString* tasks2 = pEngine->source2 + pTask->offset;
+                weight_t* results = pEngine->weights + pTask->offset;
+                uint32_t length = pTask->length;
+                uint32_t i = 0;
+                for ( ; i < length; ++i )
+                {
+                    weight_t weight = getWeight(tasks[i].str, tasks[i].len, pEngine->pPattern_ctxt, 1);
+                    if ( weight > MIN_WEIGHT )
+                    {
+                        weight_t weight2 = getWeight(tasks2[i].str, tasks2[i].len, pEngine->pPattern_ctxt2, 0);
+                        results[i] = weight2 > MIN_WEIGHT ? weight + weight2 : MIN_WEIGHT;
+                    }
+                    else
+                    {
+                        results[i] = MIN_WEIGHT;
+                    }
+                }
+            }
             else
             {
                 HighlightGroup** results = pEngine->highlights + pTask->offset;
@@ -338,7 +394,83 @@ static void* _worker(void* pParam)
 #endif
 }
 
-FuzzyEngine* createFuzzyEngine(uint32_t cpu_count)
+/**
+ * bind `thread` to the cpu whose number is `index` modulo the number of cpus.
+ */
+#if defined(_MSC_VER)
+static void setAffinity(HANDLE thread, uint32_t index)
+{
+    SYSTEM_INFO info;
+    GetSystemInfo(&info);
+    uint32_t cpu = index % info.dwNumberOfProcessors;
+    if ( cpu < sizeof(DWORD_PTR) * 8 )
+    {
+        SetThreadAffinityMask(thread, (DWORD_PTR)1 << cpu);
+    }
+}
+#else
+static void setAffinity(pthread_t thread, uint32_t index)
+{
+#if defined(__linux__)
+    long cpu_count = sysconf(_SC_NPROCESSORS_ONLN);
+    if ( cpu_count <= 0 )
+        return;
+
+    cpu_set_t cpu_set;
+    CPU_ZERO(&cpu_set);
+    CPU_SET(index % cpu_count, &cpu_set);
+    pthread_setaffinity_np(thread, sizeof(cpu_set_t), &cpu_set);
+#endif
+}
+#endif
+
+/**
+ * start the threads of `pEngine` if they have not been started yet.
+ * return 0 if success, otherwise -1.
+ */
+static int32_t startWorkers(FuzzyEngine* pEngine)
+{
+    if ( pEngine->threads )
+        return 0;
+
+#if defined(_MSC_VER)
+    pEngine->threads = (HANDLE*)malloc(pEngine->cpu_count * sizeof(HANDLE));
+#else
+    pEngine->threads = (pthread_t*)malloc(pEngine->cpu_count * sizeof(pthread_t));
+#endif
+    if ( !pEngine->threads )
+    {
+        fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
+        return -1;
+    }
+
+    uint32_t i = 0;
+    for ( ; i < pEngine->cpu_count; ++i)
+    {
+#if defined(_MSC_VER)
+        pEngine->threads[i] = CreateThread(NULL, 0, _worker, pEngine, 0, NULL);
+        if ( !pEngine->threads[i] )
+#else
+        int ret = pthread_create(&pEngine->threads[i], NULL, _worker, pEngine);
+        if ( ret != 0 )
+#endif
+        {
+            free(pEngine->threads);
+            pEngine->threads = NULL;
+            fprintf(stderr, "pthread_create error!\n");
+            return -1;
+        }
+
+        if ( pEngine->affinity )
+        {
+            setAffinity(pEngine->threads[i], i);
+        }
+    }
+
+    return 0;
+}
+
+FuzzyEngine* createFuzzyEngine(uint32_t cpu_count, uint8_t affinity)
 {
     FuzzyEngine* pEngine = (FuzzyEngine*)malloc(sizeof(FuzzyEngine));
     if ( !pEngine )
@@ -347,10 +479,15 @@ FuzzyEngine* createFuzzyEngine(uint32_t cpu_count)
     }
 
     pEngine->cpu_count = cpu_count;
+    pEngine->affinity = affinity;
     pEngine->threads = NULL;
     pEngine->pPattern_ctxt = NULL;
     pEngine->source = NULL;
     pEngine->tasks = NULL;
+    pEngine->pPattern_ctxts = NULL;
+    pEngine->pattern_count = 0;
+    pEngine->pPattern_ctxt2 = NULL;
+    pEngine->source2 = NULL;
 
     int32_t ret = 0;
     QUEUE_INIT(pEngine->task_queue, MAX_TASK_COUNT(cpu_count) + cpu_count + 1, ret);
@@ -429,23 +566,26 @@ static void delFuzzyEngine(PyObject* obj)
 }
 
 /**
- * createFuzzyEngine(cpu_count, auto_free=False)
+ * createFuzzyEngine(cpu_count, auto_free=False, affinity=False)
  *
  * `auto_free` is optional that specifies whether auto free the fuzzyEngine object.
  *      It defaults to `False`, which means do not auto free the fuzzyEngine object,
  *      so that you should call closeFuzzyEngine() manually.
+ * `affinity` is optional that specifies whether bind each thread to a cpu.
  *  return a fuzzyEngine object
  */
 static PyObject* fuzzyEngine_createFuzzyEngine(PyObject* self, PyObject* args, PyObject* kwargs)
 {
     uint32_t cpu_count;
     uint8_t  auto_free = 0;
-    static char* kwlist[] = {"cpu_count", "auto_free", NULL};
+    uint8_t  affinity = 0;
+    static char* kwlist[] = {"cpu_count", "auto_free", "affinity", NULL};
 
-    if ( !PyArg_ParseTupleAndKeywords(args, kwargs, "I|b:createFuzzyEngine", kwlist, &cpu_count, &auto_free) )
+    if ( !PyArg_ParseTupleAndKeywords(args, kwargs, "I|bb:createFuzzyEngine", kwlist, &cpu_count,
+                                      &auto_free, &affinity) )
         return NULL;
 
-    FuzzyEngine* pEngine = createFuzzyEngine(cpu_count);
+    FuzzyEngine* pEngine = createFuzzyEngine(cpu_count, affinity);
 
     return PyCapsule_New(pEngine, NULL, auto_free ? delFuzzyEngine : NULL);
 }
@@ -566,43 +706,13 @@ static PyObject* fuzzyEngine_fuzzyMatch(PyObject* self, PyObject* args, PyObject
         return NULL;
     }
 
-    if ( !pEngine->threads )
+    if ( startWorkers(pEngine) < 0 )
     {
-#if defined(_MSC_VER)
-        pEngine->threads = (HANDLE*)malloc(pEngine->cpu_count * sizeof(HANDLE));
-#else
-        pEngine->threads = (pthread_t*)malloc(pEngine->cpu_count * sizeof(pthread_t));
-#endif
-        if ( !pEngine->threads )
-        {
-            free(pEngine->source);
-            free(pEngine->tasks);
-            free(pEngine->weights);
-            free(results);
-            fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
-            return NULL;
-        }
-
-        uint32_t i = 0;
-        for ( ; i < pEngine->cpu_count; ++i)
-        {
-#if defined(_MSC_VER)
-            pEngine->threads[i] = CreateThread(NULL, 0, _worker, pEngine, 0, NULL);
-            if ( !pEngine->threads[i] )
-#else
-            int ret = pthread_create(&pEngine->threads[i], NULL, _worker, pEngine);
-            if ( ret != 0 )
-#endif
-            {
-                free(pEngine->source);
-                free(pEngine->tasks);
-                free(pEngine->weights);
-                free(results);
-                free(pEngine->threads);
-                fprintf(stderr, "pthread_create error!\n");
-                return NULL;
-            }
-        }
+        free(pEngine->source);
+        free(pEngine->tasks);
+        free(pEngine->weights);
+        free(results);
+        return NULL;
     }
 
 #if defined(_MSC_VER)
@@ -762,43 +872,13 @@ static PyObject* fuzzyEngine_fuzzyMatchEx(PyObject* self, PyObject* args, PyObje
         return NULL;
     }
 
-    if ( !pEngine->threads )
+    if ( startWorkers(pEngine) < 0 )
     {
-#if defined(_MSC_VER)
-        pEngine->threads = (HANDLE*)malloc(pEngine->cpu_count * sizeof(HANDLE));
-#else
-        pEngine->threads = (pthread_t*)malloc(pEngine->cpu_count * sizeof(pthread_t));
-#endif
-        if ( !pEngine->threads )
-        {
-            free(pEngine->source);
-            free(pEngine->tasks);
-            free(pEngine->weights);
-            free(results);
-            fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
-            return NULL;
-        }
-
-        uint32_t i = 0;
-        for ( ; i < pEngine->cpu_count; ++i)
-        {
-#if defined(_MSC_VER)
-            pEngine->threads[i] = CreateThread(NULL, 0, _worker, pEngine, 0, NULL);
-            if ( !pEngine->threads[i] )
-#else
-            int ret = pthread_create(&pEngine->threads[i], NULL, _worker, pEngine);
-            if ( ret != 0 )
-#endif
-            {
-                free(pEngine->source);
-                free(pEngine->tasks);
-                free(pEngine->weights);
-                free(results);
-                free(pEngine->threads);
-                fprintf(stderr, "pthread_create error!\n");
-                return NULL;
-            }
-        }
+        free(pEngine->source);
+        free(pEngine->tasks);
+        free(pEngine->weights);
+        free(results);
+        return NULL;
     }
 
 #if defined(_MSC_VER)
@@ -879,6 +959,266 @@ static PyObject* fuzzyEngine_fuzzyMatchEx(PyObject* self, PyObject* args, PyObje
     return Py_BuildValue("(NN)", weight_list, index_list);
 }
 
+/**
+ * convert the items of `py_source` to FeString.
+ * return NULL if failed, otherwise an array that must be freed by the caller.
+ */
+static FeString* toFeStrings(PyObject* py_source, uint32_t source_size)
+{
+    FeString* source = (FeString*)malloc(source_size * sizeof(FeString));
+    if ( !source )
+    {
+        fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
+        return NULL;
+    }
+
+    uint32_t i = 0;
+    for ( ; i < source_size; ++i )
+    {
+        FeString *s = source + i;
+        PyObject* item = PyList_GET_ITEM(py_source, i);
+        if ( pyObject_ToStringAndSize(item, &s->str, &s->len) < 0 )
+        {
+            free(source);
+            fprintf(stderr, "pyObject_ToStringAndSize error!\n");
+            return NULL;
+        }
+    }
+
+    return source;
+}
+
+/**
+ * compute the weights of `pEngine->source` using `function` in the threads of `pEngine`,
+ * `pEngine->source` and `pEngine->source2`(if not NULL) are freed before returning.
+ *
+ * return a tuple, (a list of corresponding weight, a list of index to items from `source` whose
+ * weight is greater than MIN_WEIGHT), the lists are sorted by weight if `sort_results` is true.
+ */
+static PyObject* computeWeights(FuzzyEngine* pEngine, uint32_t source_size, uint32_t function, uint8_t sort_results)
+{
+    uint32_t max_task_count  = MAX_TASK_COUNT(pEngine->cpu_count);
+    uint32_t chunk_size = (source_size + max_task_count - 1) / max_task_count;
+    uint32_t task_count = (source_size + chunk_size - 1) / chunk_size;
+
+    pEngine->tasks = (FeTaskItem*)malloc(task_count * sizeof(FeTaskItem));
+    pEngine->weights = (weight_t*)malloc(source_size * sizeof(weight_t));
+    FeResult* results = (FeResult*)malloc(source_size * sizeof(FeResult));
+    if ( !pEngine->tasks || !pEngine->weights || !results || startWorkers(pEngine) < 0 )
+    {
+        free(pEngine->source);
+        free(pEngine->source2);
+        free(pEngine->tasks);
+        free(pEngine->weights);
+        free(results);
+        pEngine->source2 = NULL;
+        fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
+        return NULL;
+    }
+
+#if defined(_MSC_VER)
+    QUEUE_SET_TASK_COUNT(pEngine->task_queue, task_count);
+#endif
+
+    uint32_t i = 0;
+    for ( ; i < task_count; ++i )
+    {
+        uint32_t offset = i * chunk_size;
+        uint32_t length = MIN(chunk_size, source_size - offset);
+
+        pEngine->tasks[i].offset = offset;
+        pEngine->tasks[i].length = length;
+        pEngine->tasks[i].function = function;
+
+        QUEUE_PUT(pEngine->task_queue, pEngine->tasks + i);
+    }
+
+    QUEUE_JOIN(pEngine->task_queue);    /* blocks until all tasks have finished */
+
+    uint32_t results_count = 0;
+    for ( i = 0; i < source_size; ++i )
+    {
+        if ( pEngine->weights[i] > MIN_WEIGHT )
+        {
+            results[results_count].weight = pEngine->weights[i];
+            results[results_count].index = i;
+            ++results_count;
+        }
+    }
+
+    free(pEngine->source);
+    free(pEngine->source2);
+    free(pEngine->tasks);
+    free(pEngine->weights);
+    pEngine->source2 = NULL;
+
+    if ( sort_results )
+    {
+        qsort(results, results_count, sizeof(FeResult), compare);
+    }
+
+    PyObject* weight_list = PyList_New(results_count);
+    PyObject* index_list = PyList_New(results_count);
+    for ( i = 0; i < results_count; ++i )
+    {
+        /* PyList_SET_ITEM() steals a reference to item. */
+        PyList_SET_ITEM(weight_list, i, Py_BuildValue("f", results[i].weight));
+        PyList_SET_ITEM(index_list, i, Py_BuildValue("I", results[i].index));
+    }
+
+    free(results);
+
+    return Py_BuildValue("(NN)", weight_list, index_list);
+}
+
+/**
+ * fuzzyMatchAll(engine, source, patterns, is_name_only=False, sort_results=True)
+ *
+ * `patterns` is a list of pattern objects returned by initPattern().
+ * an item of `source` matches only if it matches all the `patterns`, its weight is the sum of
+ * the weights of all the `patterns`, the remaining `patterns` are skipped once one does not match.
+ *
+ * return a tuple, (a list of corresponding weight, a sorted list of index to items from `source` that
+ * match all the `patterns`).
+ */
+static PyObject* fuzzyEngine_fuzzyMatchAll(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* py_engine = NULL;
+    PyObject* py_source = NULL;
+    PyObject* py_patterns = NULL;
+    uint8_t is_name_only = 0;
+    uint8_t sort_results = 1;
+    static char* kwlist[] = {"engine", "source", "patterns", "is_name_only", "sort_results", NULL};
+
+    if ( !PyArg_ParseTupleAndKeywords(args, kwargs, "OOO|bb:fuzzyMatchAll", kwlist, &py_engine,
+                                      &py_source, &py_patterns, &is_name_only, &sort_results) )
+        return NULL;
+
+    FuzzyEngine* pEngine = (FuzzyEngine*)PyCapsule_GetPointer(py_engine, NULL);
+    if ( !pEngine )
+        return NULL;
+
+    if ( !PyList_Check(py_source) || !PyList_Check(py_patterns) )
+    {
+        PyErr_SetString(PyExc_TypeError, "parameter `source` and `patterns` must be lists.");
+        return NULL;
+    }
+
+    uint32_t source_size = (uint32_t)PyList_Size(py_source);
+    uint32_t pattern_count = (uint32_t)PyList_Size(py_patterns);
+    if ( source_size == 0 || pattern_count == 0 )
+    {
+        return Py_BuildValue("([],[])");
+    }
+
+    PatternContext** pPattern_ctxts = (PatternContext**)malloc(pattern_count * sizeof(PatternContext*));
+    if ( !pPattern_ctxts )
+    {
+        fprintf(stderr, "Out of memory at %s:%d\n", __FILE__, __LINE__);
+        return NULL;
+    }
+
+    uint32_t i = 0;
+    for ( ; i < pattern_count; ++i )
+    {
+        pPattern_ctxts[i] = (PatternContext*)PyCapsule_GetPointer(PyList_GET_ITEM(py_patterns, i), NULL);
+        if ( !pPattern_ctxts[i] )
+        {
+            free(pPattern_ctxts);
+            return NULL;
+        }
+    }
+
+    pEngine->source = toFeStrings(py_source, source_size);
+    if ( !pEngine->source )
+    {
+        free(pPattern_ctxts);
+        return NULL;
+    }
+
+    pEngine->pPattern_ctxts = pPattern_ctxts;
+    pEngine->pattern_count = pattern_count;
+    pEngine->is_name_only = is_name_only;
+
+    PyObject* res = computeWeights(pEngine, source_size, GETWEIGHT_ALL, sort_results);
+
+    free(pPattern_ctxts);
+    pEngine->pPattern_ctxts = NULL;
+    pEngine->pattern_count = 0;
+
+    return res;
+}
+
+/**
+ * fuzzyMatchRefine(engine, source, source2, pattern, pattern2, sort_results=True)
+ *
+ * `source` and `source2` are lists of the same length, e.g., the file names and the directories
+ * of the same list of files.
+ * source[i] is matched against `pattern` using the name only algorithm, and source2[i] is matched
+ * against `pattern2` using the full path algorithm, the weight is the sum of the two weights if
+ * both of them match.
+ *
+ * return a tuple, (a list of corresponding weight, a sorted list of index to items that match).
+ */
+static PyObject* fuzzyEngine_fuzzyMatchRefine(PyObject* self, PyObject* args, PyObject* kwargs)
+{
+    PyObject* py_engine = NULL;
+    PyObject* py_source = NULL;
+    PyObject* py_source2 = NULL;
+    PyObject* py_patternCtxt = NULL;
+    PyObject* py_patternCtxt2 = NULL;
+    uint8_t sort_results = 1;
+    static char* kwlist[] = {"engine", "source", "source2", "pattern", "pattern2", "sort_results", NULL};
+
+    if ( !PyArg_ParseTupleAndKeywords(args, kwargs, "OOOOO|b:fuzzyMatchRefine", kwlist, &py_engine,
+                                      &py_source, &py_source2, &py_patternCtxt, &py_patternCtxt2,
+                                      &sort_results) )
+        return NULL;
+
+    FuzzyEngine* pEngine = (FuzzyEngine*)PyCapsule_GetPointer(py_engine, NULL);
+    if ( !pEngine )
+        return NULL;
+
+    if ( !PyList_Check(py_source) || !PyList_Check(py_source2) )
+    {
+        PyErr_SetString(PyExc_TypeError, "parameter `source` and `source2` must be lists.");
+        return NULL;
+    }
+
+    uint32_t source_size = (uint32_t)PyList_Size(py_source);
+    if ( (uint32_t)PyList_Size(py_source2) != source_size )
+    {
+        PyErr_SetString(PyExc_ValueError, "parameter `source` and `source2` must have the same length.");
+        return NULL;
+    }
+
+    if ( source_size == 0 )
+    {
+        return Py_BuildValue("([],[])");
+    }
+
+    pEngine->pPattern_ctxt = (PatternContext*)PyCapsule_GetPointer(py_patternCtxt, NULL);
+    if ( !pEngine->pPattern_ctxt )
+        return NULL;
+
+    pEngine->pPattern_ctxt2 = (PatternContext*)PyCapsule_GetPointer(py_patternCtxt2, NULL);
+    if ( !pEngine->pPattern_ctxt2 )
+        return NULL;
+
+    pEngine->source = toFeStrings(py_source, source_size);
+    if ( !pEngine->source )
+        return NULL;
+
+    pEngine->source2 = toFeStrings(py_source2, source_size);
+    if ( !pEngine->source2 )
+    {
+        free(pEngine->source);
+        return NULL;
+    }
+
+    return computeWeights(pEngine, source_size, GETWEIGHT_REFINE, sort_results);
+}
+
 /**
  * getHighlights(engine, source, pattern, is_name_only=False)
  *
@@ -1019,6 +1359,8 @@ static PyMethodDef fuzzyEngine_Methods[] =
     { "initPattern", (PyCFunction)fuzzyEngine_initPattern, METH_VARARGS, "initialize the pattern." },
     { "fuzzyMatch", (PyCFunction)fuzzyEngine_fuzzyMatch, METH_VARARGS | METH_KEYWORDS, "" },
     { "fuzzyMatchEx", (PyCFunction)fuzzyEngine_fuzzyMatchEx, METH_VARARGS | METH_KEYWORDS, "" },
+    { "fuzzyMatchAll", (PyCFunction)fuzzyEngine_fuzzyMatchAll, METH_VARARGS | METH_KEYWORDS, "" },
+    { "fuzzyMatchRefine", (PyCFunction)fuzzyEngine_fuzzyMatchRefine, METH_VARARGS | METH_KEYWORDS, "" },
     { "getHighlights", (PyCFunction)fuzzyEngine_getHighlights, METH_VARARGS | METH_KEYWORDS, "" },
     { NULL, NULL, 0, NULL }
 };
@@ -26,7 +26,7 @@ typedef struct FuzzyEngine FuzzyEngine;
 extern "C" {
 #endif
 
-FuzzyEngine* createFuzzyEngine(uint32_t cpu_count);
+FuzzyEngine* createFuzzyEngine(uint32_t cpu_count, uint8_t affinity);
 void closeFuzzyEngine(FuzzyEngine* pEngine);
 
 #ifdef __cplusplus
@@ -8,7 +8,6 @@ import sys
 import os.path
 import shlex
 import argparse
-import itertools
 from functools import partial
 from .utils import *
 from .explorer import *
@@ -502,9 +501,14 @@ class LfShlex(shlex.shlex):
 
 
 class AnyHub(object):
+    # the variables the argparse tree is built from
+    _schema_vars = "[g:Lf_Extensions, g:Lf_PythonExtensions, g:Lf_Arguments, g:Lf_Helps, g:Lf_CommonArguments]"
+
     def __init__(self):
         self._managers = {}
         self._parser = None
+        self._schema = None
+        self._schema_key = None
         self._pyext_manages = {}
 
     def _add_argument(self, parser, arg_list, positional_args):
@@ -558,7 +562,7 @@ class AnyHub(object):
                                  help=arg.get("help", ""))
 
     def _default_action(self, category, positional_args, arguments, *args, **kwargs):
-        if lfEval("has_key(g:Lf_Extensions, '%s')" % category) == '1':
+        if category in self._schema["extensions"]:
             if category not in self._managers:
                 # In python3, string in g:Lf_Extensions is converted to bytes by vim.bindeval(),
                 # so using vim.eval() instead.
@@ -637,33 +641,66 @@ class AnyHub(object):
         manager.startExplorer(win_pos[2:], *args, **kwargs)
 
 
-    def start(self, arg_line, *args, **kwargs):
-        if self._parser is None:
-            self._parser = argparse.ArgumentParser(prog="Leaderf[!]", epilog="If [!] is given, enter normal mode directly.")
-            self._add_argument(self._parser, lfEval("g:Lf_CommonArguments"), [])
-            subparsers = self._parser.add_subparsers(title="subcommands", description="", help="")
-            extensions = itertools.chain(lfEval("keys(g:Lf_Extensions)"), lfEval("keys(g:Lf_PythonExtensions)"))
-            for category in itertools.chain(extensions,
-                    (i for i in lfEval("keys(g:Lf_Arguments)") if i not in extensions)):
-                positional_args = []
-                if lfEval("has_key(g:Lf_Extensions, '%s')" % category) == '1':
-                    help = lfEval("get(g:Lf_Extensions['%s'], 'help', '')" % category)
-                    arg_def = lfEval("get(g:Lf_Extensions['%s'], 'arguments', [])" % category)
-                elif lfEval("has_key(g:Lf_PythonExtensions, '%s')" % category) == '1':
-                    help = lfEval("get(g:Lf_PythonExtensions['%s'], 'help', '')" % category)
-                    arg_def = lfEval("get(g:Lf_PythonExtensions['%s'], 'arguments', [])" % category)
-                else:
-                    help = lfEval("g:Lf_Helps['%s']" % category)
-                    arg_def = lfEval("g:Lf_Arguments['%s']" % category)
+    def _getSchemaKey(self):
+        """
+        return a digest of the variables the argparse tree is built from
+        """
+        return lfEval("exists('*sha256') ? sha256(string({0})) : string({0})".format(self._schema_vars))
+
+    def _getSchema(self):
+        """
+        return the help and the argument definitions of all the subcommands in one lfEval()
+        """
+        # Funcref object will be converted to None by vim.eval(), so only pick out the needed keys
+        return lfEval("{"
+                      "'extensions': map(copy(g:Lf_Extensions), "
+                      "      '{\"help\": get(v:val, \"help\", \"\"), \"arguments\": get(v:val, \"arguments\", [])}'), "
+                      "'python_extensions': map(copy(g:Lf_PythonExtensions), "
+                      "      '{\"help\": get(v:val, \"help\", \"\"), \"arguments\": get(v:val, \"arguments\", [])}'), "
+                      "'arguments': g:Lf_Arguments, "
+                      "'helps': g:Lf_Helps, "
+                      "'common': g:Lf_CommonArguments"
+                      "}")
+
+    def _buildParser(self, schema):
+        parser = argparse.ArgumentParser(prog="Leaderf[!]", epilog="If [!] is given, enter normal mode directly.")
+        self._add_argument(parser, schema["common"], [])
+        subparsers = parser.add_subparsers(title="subcommands", description="", help="")
+        categories = list(schema["extensions"])
+        categories.extend(i for i in schema["python_extensions"] if i not in schema["extensions"])
+        categories.extend(i for i in schema["arguments"] if i not in categories)
+        for category in categories:
+            positional_args = []
+            if category in schema["extensions"]:
+                help = schema["extensions"][category]["help"]
+                arg_def = schema["extensions"][category]["arguments"]
+            elif category in schema["python_extensions"]:
+                help = schema["python_extensions"][category]["help"]
+                arg_def = schema["python_extensions"][category]["arguments"]
+            else:
+                help = schema["helps"].get(category, "")
+                arg_def = schema["arguments"][category]
 
-                parser = subparsers.add_parser(category, help=help, epilog="If [!] is given, enter normal mode directly.")
-                group = parser.add_argument_group('specific arguments')
-                self._add_argument(group, arg_def, positional_args)
+            sub_parser = subparsers.add_parser(category, help=help, epilog="If [!] is given, enter normal mode directly.")
+            group = sub_parser.add_argument_group('specific arguments')
+            self._add_argument(group, arg_def, positional_args)
 
-                group = parser.add_argument_group("common arguments")
-                self._add_argument(group, lfEval("g:Lf_CommonArguments"), positional_args)
+            group = sub_parser.add_argument_group("common arguments")
+            self._add_argument(group, schema["common"], positional_args)
 
-                parser.set_defaults(start=partial(self._default_action, category, positional_args))
+            sub_parser.set_defaults(start=partial(self._default_action, category, positional_args))
+
+        return parser
+
+    def start(self, arg_line, *args, **kwargs):
+        # the argparse tree is only rebuilt if the extensions or the arguments are changed
+        key = self._getSchemaKey()
+        if self._parser is None or key != self._schema_key:
+            self._schema = self._getSchema()
+            self._parser = self._buildParser(self._schema)
+            self._schema_key = key
+            # the managers of the extensions are created with the old configurations
+            self._managers = {}
 
         try:
             # do not produce an error when extra arguments are present
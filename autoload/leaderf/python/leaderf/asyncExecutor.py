@@ -22,6 +22,7 @@ class AsyncExecutor(object):
         self._errQueue = Queue.Queue()
         self._process = None
         self._finished = False
+        self._killed = False
         self._max_count = int(lfEval("g:Lf_MaxCount"))
 
     def _readerThread(self, fd, queue, is_stdout):
@@ -59,6 +60,7 @@ class AsyncExecutor(object):
                                              universal_newlines=False)
 
         self._finished = False
+        self._killed = False
 
         stdout_thread = threading.Thread(target=self._readerThread,
                                          args=(self._process.stdout, self._outQueue, True))
@@ -88,8 +90,22 @@ class AsyncExecutor(object):
                 except OSError:
                     pass
 
+            self._killed = True
             self._process = None
 
+    def isComplete(self):
+        """
+        return True if the process exited on its own with returncode 0,
+        i.e., its output is complete
+        """
+        if self._killed or self._process is None:
+            return False
+
+        try:
+            return self._process.wait() == 0
+        except OSError:
+            return False
+
     class Result(object):
         def __init__(self, outQueue, errQueue, encoding, cleanup, process):
             self._outQueue = outQueue
@@ -128,6 +144,68 @@ class AsyncExecutor(object):
                     self._cleanup()
 
 
+class AsyncExecutorPool(object):
+    """
+    A class to keep at most `size` commands of AsyncExecutor running
+    at the same time, and collect their output in the order they finish.
+    """
+    def __init__(self, size):
+        self._size = max(size, 1)
+        self._doneQueue = Queue.Queue()
+
+    def _collectorThread(self, key, result):
+        try:
+            self._doneQueue.put((key, list(result), None))
+        except Exception as e:
+            self._doneQueue.put((key, None, e))
+
+    def imap(self, items):
+        """
+        `items` is consumed lazily, each item is a tuple (key, result), where
+        result is either an AsyncExecutor.Result whose command has just been
+        started, or a list that is already available.
+        yield a tuple (key, lines) as soon as the lines of a command are ready.
+        """
+        items = iter(items)
+        running = 0
+        exhausted = False
+        ready = []
+        while True:
+            # start new commands before yielding anything,
+            # so that the pool is always busy
+            while not exhausted and running < self._size:
+                try:
+                    key, result = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                if isinstance(result, list):
+                    ready.append((key, result))
+                else:
+                    collector = threading.Thread(target=self._collectorThread,
+                                                 args=(key, result))
+                    collector.daemon = True
+                    collector.start()
+                    running += 1
+
+            for r in ready:
+                yield r
+            ready = []
+
+            if running == 0:
+                break
+
+            key, lines, error = self._doneQueue.get()
+            running -= 1
+            if error is not None:
+                # wait for the running commands, no collector is left behind
+                for i in range(running):
+                    self._doneQueue.get()
+                raise error
+            ready.append((key, lines))
+
+
 if __name__ == "__main__":
     executor = AsyncExecutor()
     out = executor.execute("ctags -f- -R")
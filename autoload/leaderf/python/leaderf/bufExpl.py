@@ -19,6 +19,9 @@ class BufferExplorer(Explorer):
     def __init__(self):
         self._prefix_length = 0
         self._max_bufname_len = 0
+        self._ambiwidth = 1
+        self._encoding = None
+        self._lines = {}    # a dict with (key, value) = (buffer name, line in the content)
 
     def getContent(self, *args, **kwargs):
         mru_bufnrs = []
@@ -49,22 +52,26 @@ class BufferExplorer(Explorer):
         bufnr_len = len(lfEval("bufnr('$')"))
         self._prefix_length = bufnr_len + 8
 
-        self._max_bufname_len = max([int(lfEval("strdisplaywidth('%s')"
-                                        % escQuote(getBasename(buffers[nr].name))))
+        self._ambiwidth = lfAmbiwidth()
+        self._encoding = lfEval("&encoding")
+        self._max_bufname_len = max([lfDisplayWidth(getBasename(buffers[nr].name), self._ambiwidth,
+                                                    encoding=self._encoding)
                                     for nr in mru.getMruBufnrs() if nr in buffers] or [0])
 
+        show_relative_path = lfEval("g:Lf_ShowRelativePath") == '1'
+        self._lines = {}
         bufnames = []
         for nr in mru.getMruBufnrs():
             if nr in buffers:
                 buf_name = buffers[nr].name
                 if not buf_name:
                     buf_name = "[No Name]"
-                if lfEval("g:Lf_ShowRelativePath") == '1':
+                if show_relative_path:
                     buf_name = lfRelpath(buf_name)
                 basename = getBasename(buf_name)
                 dirname = getDirname(buf_name)
-                space_num = self._max_bufname_len \
-                            - int(lfEval("strdisplaywidth('%s')" % escQuote(basename)))
+                space_num = self._max_bufname_len - lfDisplayWidth(basename, self._ambiwidth,
+                                                                   encoding=self._encoding)
                 # e.g., 12 u %a+- aaa.txt
                 buf_name = '{:{width}d} {:1s} {:1s}{:1s}{:1s}{:1s} {}{} "{}"'.format(nr,
                             '' if buffers[nr].options["buflisted"] else 'u',
@@ -77,6 +84,7 @@ class BufferExplorer(Explorer):
                             dirname if dirname else '.' + os.sep,
                             width=bufnr_len)
                 bufnames.append(buf_name)
+                self._lines[buffers[nr].name] = buf_name
                 del buffers[nr]
             elif lfEval("bufnr(%d)" % nr) == '-1':
                 mru.delMruBufnr(nr)
@@ -98,6 +106,15 @@ class BufferExplorer(Explorer):
     def getMaxBufnameLen(self):
         return self._max_bufname_len
 
+    def getAmbiwidth(self):
+        return self._ambiwidth
+
+    def getEncoding(self):
+        return self._encoding
+
+    def getLines(self):
+        return self._lines
+
 
 #*****************************************************
 # BufExplManager
@@ -113,6 +130,10 @@ class BufExplManager(Manager):
     def _defineMaps(self):
         lfCmd("call leaderf#Buffer#Maps()")
 
+    def _getFrecencyBoosts(self):
+        mru.flush()
+        return mru.getFrecencyBoosts(self._getExplorer().getLines().get)
+
     def _acceptSelection(self, *args, **kwargs):
         if len(args) == 0:
             return
@@ -164,7 +185,8 @@ class BufExplManager(Manager):
             buf_number = int(re.sub(r"^.*?(\d+).*$", r"\1", line))
             basename = getBasename(vim.buffers[buf_number].name)
             space_num = self._getExplorer().getMaxBufnameLen() \
-                        - int(lfEval("strdisplaywidth('%s')" % escQuote(basename)))
+                        - lfDisplayWidth(basename, self._getExplorer().getAmbiwidth(),
+                                         encoding=self._getExplorer().getEncoding())
             return prefix_len + lfBytesLen(basename) + space_num + 2
 
     def _createHelp(self):
@@ -183,16 +205,13 @@ class BufExplManager(Manager):
 
     def _afterEnter(self):
         super(BufExplManager, self)._afterEnter()
-        id = int(lfEval("matchadd('Lf_hl_bufNumber', '^\s*\zs\d\+')"))
-        self._match_ids.append(id)
-        id = int(lfEval("matchadd('Lf_hl_bufIndicators', '^\s*\d\+\s*\zsu\=\s*[#%]\=...')"))
-        self._match_ids.append(id)
-        id = int(lfEval("matchadd('Lf_hl_bufModified', '^\s*\d\+\s*u\=\s*[#%]\=.+\s*\zs.*$')"))
-        self._match_ids.append(id)
-        id = int(lfEval("matchadd('Lf_hl_bufNomodifiable', '^\s*\d\+\s*u\=\s*[#%]\=..-\s*\zs.*$')"))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_bufDirname', ' \zs".*"$')'''))
-        self._match_ids.append(id)
+        self._match_ids.extend(self._addMatches([
+                ('Lf_hl_bufNumber', r'^\s*\zs\d\+'),
+                ('Lf_hl_bufIndicators', r'^\s*\d\+\s*\zsu\=\s*[#%]\=...'),
+                ('Lf_hl_bufModified', r'^\s*\d\+\s*u\=\s*[#%]\=.+\s*\zs.*$'),
+                ('Lf_hl_bufNomodifiable', r'^\s*\d\+\s*u\=\s*[#%]\=..-\s*\zs.*$'),
+                ('Lf_hl_bufDirname', r' \zs".*"$'),
+                ]))
 
     def _beforeExit(self):
         super(BufExplManager, self)._beforeExit()
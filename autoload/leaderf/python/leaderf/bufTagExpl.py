@@ -10,9 +10,11 @@ import tempfile
 import itertools
 import multiprocessing
 from .utils import *
+from .config import *
 from .explorer import *
 from .manager import *
-from .asyncExecutor import AsyncExecutor
+from .asyncExecutor import AsyncExecutor, AsyncExecutorPool
+from .ctagsCache import *
 
 
 #*****************************************************
@@ -28,27 +30,27 @@ class BufTagExplorer(Explorer):
 
     def getContent(self, *args, **kwargs):
         if "--all" in kwargs.get("arguments", {}): # all buffers
-            cur_buffer = vim.current.buffer
-            for b in vim.buffers:
-                if b.options["buflisted"]:
-                    if lfEval("bufloaded(%d)" % b.number) == '0':
-                        vim.current.buffer = b
-            if vim.current.buffer != cur_buffer:
+            unloaded = lfEval("filter(range(1, bufnr('$')), 'buflisted(v:val) && !bufloaded(v:val)')")
+            if unloaded:
+                cur_buffer = vim.current.buffer
+                for nr in unloaded:
+                    vim.current.buffer = vim.buffers[int(nr)]
                 vim.current.buffer = cur_buffer
 
-            for b in vim.buffers:
-                if b.options["buflisted"] and b.name:
-                    changedtick = int(lfEval("getbufvar(%d, 'changedtick')" % b.number))
-                    if changedtick != self._buf_changedtick.get(b.number, -1):
-                        break
+            buffer_info = lfGetBufferInfo()
+            for nr, info in buffer_info.items():
+                if info[0] != self._buf_changedtick.get(nr, -1):
+                    break
             else:
                 return list(itertools.chain.from_iterable(self._tag_list.values()))
 
-            return itertools.chain.from_iterable(self._getTagList())
+            return itertools.chain.from_iterable(self._getTagList(buffer_info))
         else:
-            result = self._getTagResult(vim.current.buffer)
+            buffer = vim.current.buffer
+            result = self._getTagResult(buffer, lfGetBufferInfo([buffer.number]).get(buffer.number),
+                                        lfEval("&encoding"))
             if not isinstance(result, list):
-                result = self._formatResult(*result)
+                result = self._formatResult(buffer, result)
             tag_list = []
             for i, line in enumerate(result):
                 if self._supports_preview and i & 1:
@@ -58,30 +60,35 @@ class BufTagExplorer(Explorer):
                     tag_list.append("{}\t  :{}".format(first.rsplit("\t", 1)[0], second))
             return tag_list
 
-    def _getTagList(self):
-        buffers = [b for b in vim.buffers]
-        n = multiprocessing.cpu_count()
-        for i in range(0, len(vim.buffers), n):
-            tag_list = []
-            exe_result = []
-            for b in buffers[i:i+n]:
-                if b.options["buflisted"] and b.name:
-                    result = self._getTagResult(b)
+    def _getTagList(self, buffer_info):
+        """
+        keep at most cpu_count ctags processes running, and yield the tag list
+        of each buffer as soon as its ctags process finishes
+        """
+        # the output of ctags is decoded on the collector threads of the pool,
+        # which must not call lfEval()
+        encoding = lfEval("&encoding")
+
+        def results():
+            for b in vim.buffers:
+                if b.number in buffer_info:
+                    result = self._getTagResult(b, buffer_info[b.number], encoding)
                     if isinstance(result, list):
-                        tag_list.extend(result)
+                        yield (None, result)
                     else:
-                        exe_result.append(result)
-            if not exe_result:
-                yield tag_list
+                        yield (b, result)
+
+        pool = AsyncExecutorPool(multiprocessing.cpu_count())
+        for buffer, result in pool.imap(results()):
+            if buffer is None:
+                yield result
             else:
-                exe_taglist = (self._formatResult(*r) for r in exe_result)
-                # list can reduce the flash of screen
-                yield list(itertools.chain(tag_list, itertools.chain.from_iterable(exe_taglist)))
+                yield self._formatResult(buffer, result)
 
-    def _getTagResult(self, buffer):
-        if not buffer.name or lfEval("bufloaded(%d)" % buffer.number) == '0':
+    def _getTagResult(self, buffer, info, encoding):
+        if not buffer.name or info is None:
             return []
-        changedtick = int(lfEval("getbufvar(%d, 'changedtick')" % buffer.number))
+        changedtick, filetype, modified = info
         # there is no change since last call
         if changedtick == self._buf_changedtick.get(buffer.number, -1):
             if buffer.number in self._tag_list:
@@ -91,20 +98,18 @@ class BufTagExplorer(Explorer):
         else:
             self._buf_changedtick[buffer.number] = changedtick
 
-        if lfEval("getbufvar(%d, '&filetype')" % buffer.number) == "cpp":
+        if filetype == "cpp":
             extra_options = "--c++-kinds=+p"
-        elif lfEval("getbufvar(%d, '&filetype')" % buffer.number) == "c":
+        elif filetype == "c":
             extra_options = "--c-kinds=+p"
-        elif lfEval("getbufvar(%d, '&filetype')" % buffer.number) == "python":
+        elif filetype == "python":
             extra_options = "--language-force=Python"
         else:
             extra_options = ""
 
-        executor = AsyncExecutor()
-        self._executor.append(executor)
-        if buffer.options["modified"] == True:
+        if modified:
             if sys.version_info >= (3, 0):
-                tmp_file = partial(tempfile.NamedTemporaryFile, encoding=lfEval("&encoding"))
+                tmp_file = partial(tempfile.NamedTemporaryFile, encoding=encoding)
             else:
                 tmp_file = tempfile.NamedTemporaryFile
 
@@ -115,15 +120,25 @@ class BufTagExplorer(Explorer):
             # {tagname}<Tab>{tagfile}<Tab>{tagaddress}[;"<Tab>{tagfield}..]
             # {tagname}<Tab>{tagfile}<Tab>{tagaddress};"<Tab>{kind}<Tab>{scope}
             cmd = '{} -n -u --fields=Ks {} -f- "{}"'.format(self._ctags, extra_options, lfDecode(file_name))
-            result = executor.execute(cmd, cleanup=partial(os.remove, file_name))
+            executor = AsyncExecutor()
+            self._executor.append(executor)
+            result = executor.execute(cmd, encoding=encoding, cleanup=partial(os.remove, file_name))
         else:
             cmd = '{} -n -u --fields=Ks {} -f- "{}"'.format(self._ctags, extra_options, lfDecode(buffer.name))
-            result = executor.execute(cmd)
+            key = ctagsCache.getKey(buffer.name, cmd)
+            cached_output = ctagsCache.get(key)
+            if cached_output is not None:
+                return self._formatResult(buffer, cached_output)
 
-        return (buffer, result)
+            executor = AsyncExecutor()
+            self._executor.append(executor)
+            result = ctagsCache.record(key, executor.execute(cmd, encoding=encoding), executor)
+
+        return result
 
     def _formatResult(self, buffer, result):
-        if not buffer.name or lfEval("bufloaded(%d)" % buffer.number) == '0':
+        # only the loaded buffers returned by lfGetBufferInfo() get here
+        if not buffer.name:
             return []
 
         # a list of [tag, file, line, kind, scope]
@@ -152,6 +167,11 @@ class BufTagExplorer(Explorer):
         tab_len = buffer.options["shiftwidth"]
         std_tag_kind_len = tag_len // tab_len * tab_len + tab_len + max_kind_len
 
+        ambiwidth, tabstop, encoding = lfEval("[&ambiwidth, &tabstop, &encoding]")
+        ambiwidth = 2 if ambiwidth == "double" else 1
+        tabstop = int(tabstop)
+        bufname = buffer.name if vim.options["autochdir"] else lfRelpath(buffer.name)
+
         tag_list = []
         for _, item  in enumerate(output):
             scope = item[4] if len(item) > 4 else "Global"
@@ -159,10 +179,9 @@ class BufTagExplorer(Explorer):
                                                  item[3],   # kind
                                                  taglen=tag_len
                                                  )
-            tag_kind_len = int(lfEval("strdisplaywidth('%s')" % escQuote(tag_kind)))
+            tag_kind_len = lfDisplayWidth(tag_kind, ambiwidth, tabstop, encoding)
             num = std_tag_kind_len - tag_kind_len
             space_num = num if num > 0 else 0
-            bufname = buffer.name if vim.options["autochdir"] else lfRelpath(buffer.name)
             line = "{}{}\t{}\t{:2s}{}:{}\t{}".format(tag_kind,
                                                      ' ' * space_num,
                                                      scope,          # scope
@@ -251,6 +270,9 @@ class BufTagExplManager(Manager):
         lfCmd("norm! zz")
         lfCmd("setlocal cursorline! | redraw | sleep 20m | setlocal cursorline!")
 
+    def _cachesDigests(self):
+        return True
+
     def _getDigest(self, line, mode):
         """
         specify what part in the line to be processed and highlighted
@@ -296,18 +318,14 @@ class BufTagExplManager(Manager):
 
     def _afterEnter(self):
         super(BufTagExplManager, self)._afterEnter()
-        id = int(lfEval('''matchadd('Lf_hl_buftagKind', '^[^\t]*\t\zs\S\+')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_buftagScopeType', '[^\t]*\t\S\+\s*\zs\w\+:')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_buftagScope', '^[^\t]*\t\S\+\s*\(\w\+:\)\=\zs\S\+')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_buftagDirname', '[^\t]*\t\S\+\s*\S\+\s*\zs[^\t]\+')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_buftagLineNum', '\d\+\t\ze\d\+$')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_buftagCode', '^\s\+.*')'''))
-        self._match_ids.append(id)
+        self._match_ids.extend(self._addMatches([
+                ('Lf_hl_buftagKind', r'^[^\t]*\t\zs\S\+'),
+                ('Lf_hl_buftagScopeType', r'[^\t]*\t\S\+\s*\zs\w\+:'),
+                ('Lf_hl_buftagScope', r'^[^\t]*\t\S\+\s*\(\w\+:\)\=\zs\S\+'),
+                ('Lf_hl_buftagDirname', r'[^\t]*\t\S\+\s*\S\+\s*\zs[^\t]\+'),
+                ('Lf_hl_buftagLineNum', r'\d\+\t\ze\d\+$'),
+                ('Lf_hl_buftagCode', r'^\s\+.*'),
+                ]))
 
     def _beforeExit(self):
         super(BufTagExplManager, self)._beforeExit()
@@ -330,76 +348,18 @@ class BufTagExplManager(Manager):
     def _supportsRefine(self):
         return True
 
-    def _fuzzyFilter(self, is_full_path, get_weight, iterable):
-        """
-        return a list, each item is a pair (weight, (line1, line2))
-        """
-        if self._supports_preview:
-            if len(iterable) < 2:
-                return []
-            getDigest = partial(self._getDigest, mode=0 if is_full_path else 1)
-            pairs = ((get_weight(getDigest(line)), (line, iterable[2*i+1]))
-                       for i, line in enumerate(iterable[::2]))
-            MIN_WEIGHT = fuzzyMatchC.MIN_WEIGHT if is_fuzzyMatch_C else FuzzyMatch.MIN_WEIGHT
-            return (t for t in pairs if t[0] > MIN_WEIGHT)
-        else:
-            return super(BufTagExplManager, self)._fuzzyFilter(is_full_path,
-                                                               get_weight,
-                                                               iterable)
-
-    def _refineFilter(self, first_get_weight, get_weight, iterable):
-        if self._supports_preview:
-            if len(iterable) < 2:
-                return []
-            getDigest = self._getDigest
-            tuples = ((first_get_weight(getDigest(line, 1)), get_weight(getDigest(line, 2)),
-                       line, iterable[2*i+1]) for i, line in enumerate(iterable[::2]))
-            MIN_WEIGHT = fuzzyMatchC.MIN_WEIGHT if is_fuzzyMatch_C else FuzzyMatch.MIN_WEIGHT
-            return ((i[0] + i[1], (i[2], i[3])) for i in tuples if i[0] > MIN_WEIGHT and i[1] > MIN_WEIGHT)
-        else:
-            return super(BufTagExplManager, self)._refineFilter(first_get_weight,
-                                                                get_weight,
-                                                                iterable)
-
     def _regexFilter(self, iterable):
         if self._supports_preview:
-            try:
-                if ('-2' == lfEval("g:LfNoErrMsgMatch('', '%s')" % escQuote(self._cli.pattern))):
-                    return iter([])
-                else:
-                    result = []
-                    for i, line in enumerate(iterable[::2]):
-                        if ('-1' != lfEval("g:LfNoErrMsgMatch('%s', '%s')" %
-                            (escQuote(self._getDigest(line, 1).strip()),
-                                escQuote(self._cli.pattern)))):
-                            result.append(line)
-                            result.append(iterable[2*i+1])
-                    return result
-            except vim.error:
-                return iter([])
+            return super(BufTagExplManager, self)._regexFilter(iterable, 1)
         else:
             return super(BufTagExplManager, self)._regexFilter(iterable)
 
-    def _getList(self, pairs):
-        """
-        return a list constructed from `pairs`
-        Args:
-            pairs: a list of tuple(weight, (line1, line2))
-        """
-        if self._supports_preview:
-            result = []
-            for _, p in enumerate(pairs):
-                result.extend(p[1])
-            return result
-        else:
-            return super(BufTagExplManager, self)._getList(pairs)
-
     def _toUp(self):
         if self._supports_preview:
             if self._getInstance().isReverseOrder() and self._getInstance().getCurrentPos()[0] <= 3:
                 self._setResultContent()
                 if self._cli.pattern and len(self._highlight_pos) < len(self._getInstance().buffer) // 2 \
-                        and len(self._highlight_pos) < int(lfEval("g:Lf_NumberOfHighlight")):
+                        and len(self._highlight_pos) < lfConfig.number_of_highlight:
                     self._highlight_method()
 
             if self._getInstance().isReverseOrder():
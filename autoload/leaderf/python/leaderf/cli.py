@@ -8,6 +8,8 @@ from datetime import datetime
 from functools import wraps
 from collections import OrderedDict
 from .utils import *
+from .config import *
+from .tracer import *
 
 
 def cursorController(func):
@@ -143,7 +145,7 @@ class LfCli(object):
                 lfCmd("hi! default link Lf_hl_cursor Cursor")
             else:
                 lfCmd("hi! default link Lf_hl_cursor NONE")
-            if lfEval("g:Lf_CursorBlink") == '1':
+            if lfConfig.cursor_blink:
                 self._start_time = datetime.now()
                 self._blinkon = not self._blinkon
 
@@ -213,8 +215,7 @@ class LfCli(object):
             return
         if self._is_fuzzy:
             # matchaddpos() is introduced by Patch 7.4.330
-            if (lfEval("exists('*matchaddpos')") == '1' and
-                    lfEval("g:Lf_HighlightIndividual") == '1'):
+            if lfConfig.has_matchaddpos and lfConfig.highlight_individual:
                 return
             cmdline = [r'\/' if c == '/' else r'\\' if c == '\\' else c
                        for c in self._cmdline] # \/ for syn match
@@ -281,7 +282,7 @@ class LfCli(object):
                             i += 1
                     regex = ''.join(tmpRe)
 
-                if lfEval("&ignorecase") == '1':
+                if lfConfig.ignorecase:
                     regex = r'\c' + regex
 
                 try:
@@ -429,10 +430,12 @@ class LfCli(object):
             self._history_index = 0
             self._blinkon = True
             while 1:
-                self._buildPrompt()
+                with tracer.span("LfCli._buildPrompt"):
+                    self._buildPrompt()
+                tracer.end()
                 self._idle = False
 
-                if lfEval("g:Lf_CursorBlink") == '1':
+                if lfConfig.cursor_blink:
                     try:
                         callback()
                         time.sleep(0.001) # cpu usage 100% without sleep
@@ -440,7 +443,7 @@ class LfCli(object):
                         lfPrintError(e)
                         break
 
-                if lfEval("g:Lf_CursorBlink") == '1':
+                if lfConfig.cursor_blink:
                     lfCmd("let nr = getchar(1)")
                     if lfEval("!type(nr) && nr == 0") == '1':
                         self._idle = True
@@ -461,6 +464,8 @@ class LfCli(object):
                     lfCmd("let nr = getchar()")
                     lfCmd("let ch = !type(nr) ? nr2char(nr) : nr")
 
+                tracer.begin()
+
                 if lfEval("!type(nr) && nr >= 0x20") == '1':
                     self._insert(lfEval("ch"))
                     self._buildPattern()
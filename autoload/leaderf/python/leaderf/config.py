@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .utils import *
+
+
+def _toBool(value):
+    return value not in ('0', '')
+
+
+#*****************************************************
+# LfConfig
+#*****************************************************
+class LfConfig(object):
+    """
+    A snapshot of the options that are read in the hot paths, e.g., the input
+    loop, the filtering and the highlighting, so that they do not cost a round
+    trip to vim each time.
+    The snapshot is taken in one lfEval() when the module is imported, and
+    refreshed when a LeaderF command is launched or one of the vim options
+    in it is changed, see the OptionSet autocmd in autoload/leaderf.vim.
+    The snapshot is only taken in the main thread, the worker threads just
+    read it, since vim can not be called from them.
+    """
+    # (attribute, vim expression, type)
+    _options = [
+        ("cursor_blink",           "g:Lf_CursorBlink",         _toBool),
+        ("highlight_individual",   "g:Lf_HighlightIndividual", _toBool),
+        ("number_of_highlight",    "g:Lf_NumberOfHighlight",   int),
+        ("index_time_limit",       "g:Lf_IndexTimeLimit",      float),
+        ("has_matchaddpos",        "exists('*matchaddpos')",   _toBool),
+        ("encoding",               "&encoding",                str),
+        ("ignorecase",             "&ignorecase",              _toBool),
+    ]
+
+    def __init__(self):
+        self._expr = "[%s]" % ", ".join(expr for _, expr, _ in self._options)
+        self.refresh()
+
+    def refresh(self):
+        """
+        take a new snapshot of the options
+        """
+        for (name, _, convert), value in zip(self._options, lfEval(self._expr)):
+            setattr(self, name, convert(value))
+
+    def invalidate(self):
+        """
+        refresh the snapshot after one of the vim options in it is changed
+        """
+        self.refresh()
+
+
+#*****************************************************
+# lfConfig is a singleton
+#*****************************************************
+lfConfig = LfConfig()
+
+__all__ = ['lfConfig']
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import os.path
+import hashlib
+import threading
+from .utils import *
+
+
+#*****************************************************
+# CtagsCache
+#*****************************************************
+class CtagsCache(object):
+    """
+    A persistent cache of the output of ctags, shared by BufTag and Function.
+    Each entry is keyed by the path, mtime and size of the file together with
+    the ctags command, the least recently used entries are removed when the
+    total size exceeds g:Lf_CtagsCacheSize.
+    """
+    def __init__(self):
+        self._cache_dir = os.path.join(lfEval("g:Lf_CacheDirectory"),
+                                       '.LfCache',
+                                       'python' + lfEval("g:Lf_PythonVersion"),
+                                       'ctags')
+        self._max_size = int(float(lfEval("g:Lf_CtagsCacheSize")) * 1024 * 1024)
+        self._total_size = None
+        self._lock = threading.Lock()
+        self._initCache()
+
+    def _initCache(self):
+        if self._max_size > 0 and not os.path.exists(self._cache_dir):
+            os.makedirs(self._cache_dir)
+
+    def getKey(self, file_name, cmd):
+        """
+        return the key of the cache entry of `file_name`,
+        None if the cache is disabled or the file does not exist
+        """
+        if self._max_size <= 0:
+            return None
+
+        try:
+            st = os.stat(lfDecode(file_name))
+        except OSError:
+            return None
+
+        key = "%s\t%r\t%d\t%s" % (file_name, st.st_mtime, st.st_size, cmd)
+        if sys.version_info >= (3, 0):
+            key = key.encode("utf-8", errors="ignore")
+        return hashlib.md5(key).hexdigest()
+
+    def get(self, key):
+        """
+        return the lines of the cache entry `key`, None if it does not exist
+        """
+        if key is None:
+            return None
+
+        cache_file = os.path.join(self._cache_dir, key)
+        try:
+            with lfOpen(cache_file, 'r', errors='ignore') as f:
+                lines = [line.rstrip('\n') for line in f]
+            # the mtime of the cache file records the last access
+            os.utime(cache_file, None)
+            return lines
+        except (IOError, OSError):
+            return None
+
+    def record(self, key, result, executor):
+        """
+        return a generator that yields the lines of `result`,
+        and saves them as the cache entry `key` once `result` is exhausted,
+        if the ctags run by `executor` is killed or fails, the lines are not saved
+        """
+        lines = []
+        for line in result:
+            lines.append(line)
+            yield line
+
+        if key is not None and executor.isComplete():
+            self._save(key, lines)
+
+    def _save(self, key, lines):
+        cache_file = os.path.join(self._cache_dir, key)
+        tmp_file = "%s.%d.%d" % (cache_file, os.getpid(), threading.current_thread().ident)
+        try:
+            with lfOpen(tmp_file, 'w', errors='ignore') as f:
+                for line in lines:
+                    f.write(line + '\n')
+            if os.name == 'nt' and os.path.exists(cache_file):
+                os.remove(cache_file)
+            os.rename(tmp_file, cache_file)
+            size = os.path.getsize(cache_file)
+        except (IOError, OSError):
+            return
+
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._getTotalSize()
+            else:
+                self._total_size += size
+
+            if self._total_size > self._max_size:
+                self._evict()
+
+    def _getEntries(self):
+        """
+        return a list of (mtime, size, path) of all the cache entries
+        """
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            path = os.path.join(self._cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _getTotalSize(self):
+        return sum(size for _, size, _ in self._getEntries())
+
+    def _evict(self):
+        """
+        remove the least recently used entries until the total size is
+        less than 3/4 of g:Lf_CtagsCacheSize
+        """
+        entries = sorted(self._getEntries())
+        total_size = sum(size for _, size, _ in entries)
+        limit = self._max_size * 3 // 4
+        for _, size, path in entries:
+            if total_size <= limit:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+            except OSError:
+                pass
+        self._total_size = total_size
+
+
+#*****************************************************
+# ctagsCache is a singleton
+#*****************************************************
+ctagsCache = CtagsCache()
+
+__all__ = ['ctagsCache']
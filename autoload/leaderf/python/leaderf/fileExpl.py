@@ -8,10 +8,15 @@ import os.path
 import fnmatch
 import time
 import locale
+import threading
+import subprocess
 from functools import wraps
 from .utils import *
+from .rootResolver import *
+from .config import *
 from .explorer import *
 from .manager import *
+from .mru import *
 from .asyncExecutor import AsyncExecutor
 
 def showRelativePath(func):
@@ -45,6 +50,9 @@ class FileExplorer(Explorer):
         self._initCache()
         self._executor = []
         self._no_ignore = None
+        self._prewarm_thread = None
+        # (dir, cmd, file list, from cache) loaded by the prewarm thread
+        self._prewarm_result = None
 
     def _initCache(self):
         if not os.path.exists(self._cache_dir):
@@ -55,6 +63,7 @@ class FileExplorer(Explorer):
 
     def _getFiles(self, dir):
         start_time = time.time()
+        index_time_limit = lfConfig.index_time_limit
         wildignore = lfEval("g:Lf_WildIgnore")
         file_list = []
         for dir_path, dirs, files in os.walk(dir, followlinks = False
@@ -65,8 +74,7 @@ class FileExplorer(Explorer):
                 if True not in (fnmatch.fnmatch(name, j)
                                 for j in wildignore['file']):
                     file_list.append(lfEncode(os.path.join(dir_path,name)))
-                if time.time() - start_time > float(
-                        lfEval("g:Lf_IndexTimeLimit")):
+                if time.time() - start_time > index_time_limit:
                     return file_list
         return file_list
 
@@ -170,23 +178,7 @@ class FileExplorer(Explorer):
         return True if `dir` exists in `path` or its ancestor path,
         otherwise return False
         """
-        if os.name == 'nt':
-            # e.g. C:\\
-            root = os.path.splitdrive(os.path.abspath(path))[0] + os.sep
-        else:
-            root = '/'
-
-        while os.path.abspath(path) != root:
-            cur_dir = os.path.join(path, dir)
-            if os.path.exists(cur_dir) and os.path.isdir(cur_dir):
-                return True
-            path = os.path.join(path, "..")
-
-        cur_dir = os.path.join(path, dir)
-        if os.path.exists(cur_dir) and os.path.isdir(cur_dir):
-            return True
-
-        return False
+        return rootResolver.exists(path, dir)
 
     def _expandGlob(self, type, glob):
         # is absolute path
@@ -206,12 +198,20 @@ class FileExplorer(Explorer):
                 return glob
 
     def _buildCmd(self, dir, **kwargs):
-        if lfEval("g:Lf_ShowRelativePath") == '1':
+        cmd = self._getCmd(dir, **kwargs)
+        self._external_cmd = cmd
+        return cmd
+
+    def _getCmd(self, dir, **kwargs):
+        """
+        return the command that lists the files in `dir`, None if there is no tool
+        to do it, the state of the explorer is not changed
+        """
+        if lfEval("g:Lf_ShowRelativePath") == '1' and not kwargs.get("absolute_path", False):
             dir = os.path.relpath(dir)
 
         if lfEval("exists('g:Lf_ExternalCommand')") == '1':
             cmd = lfEval("g:Lf_ExternalCommand") % dir.join('""')
-            self._external_cmd = cmd
             return cmd
 
         if lfEval("g:Lf_UseVersionControlTool") == '1':
@@ -238,7 +238,6 @@ class FileExplorer(Explorer):
                     recurse_submodules = ""
 
                 cmd = 'git ls-files %s "%s" && git ls-files --others %s %s "%s"' % (recurse_submodules, dir, no_ignore, ignore, dir)
-                self._external_cmd = cmd
                 return cmd
             elif self._exists(dir, ".hg"):
                 wildignore = lfEval("g:Lf_WildIgnore")
@@ -253,7 +252,6 @@ class FileExplorer(Explorer):
                     ignore += ' -X "%s"' % self._expandGlob("file", i)
 
                 cmd = 'hg files %s "%s"' % (ignore, dir)
-                self._external_cmd = cmd
                 return cmd
 
         if lfEval("exists('g:Lf_DefaultExternalTool')") == '1':
@@ -400,8 +398,6 @@ class FileExplorer(Explorer):
         else:
             cmd = None
 
-        self._external_cmd = cmd
-
         return cmd
 
     def _writeCache(self, content):
@@ -466,6 +462,17 @@ class FileExplorer(Explorer):
                     for line in content:
                         cache_file.write(line + '\n')
 
+    def _getCacheFile(self, dir):
+        """
+        return the path of the cache file of `dir`, None if `dir` is not cached
+        """
+        dir = dir if dir.endswith(os.sep) else dir + os.sep
+        with lfOpen(self._cache_index, 'r', errors='ignore') as f:
+            for line in f:
+                if dir == line.split(None, 2)[2].strip():
+                    return os.path.join(self._cache_dir, line.split(None, 2)[1])
+        return None
+
     def _getFilesFromCache(self):
         dir = self._cur_dir if self._cur_dir.endswith(os.sep) else self._cur_dir + os.sep
         with lfOpen(self._cache_index, 'r+', errors='ignore') as f:
@@ -547,6 +554,17 @@ class FileExplorer(Explorer):
 
         if arg_changes or lfEval("g:Lf_UseMemoryCache") == '0' or dir != self._cur_dir or \
                 not self._content:
+            prewarm_result = self._prewarm_result
+            self._prewarm_result = None
+            if prewarm_result and prewarm_result[0] == dir and not no_ignore \
+                    and lfEval("g:Lf_UseMemoryCache") == '1' and kwargs.get("refresh", False) == False:
+                self._cur_dir = dir
+                self._external_cmd = prewarm_result[1]
+                lfCmd("let g:Lf_Debug_Cmd = '%s'" % escQuote(prewarm_result[1]))
+                lfCmd("let g:Lf_FilesFromCache = %d" % prewarm_result[3])
+                self._content = prewarm_result[2]
+                return self._content
+
             self._cur_dir = dir
 
             cmd = self._buildCmd(dir, **kwargs)
@@ -573,6 +591,87 @@ class FileExplorer(Explorer):
 
         return self._content
 
+    def prewarm(self, dir):
+        """
+        load the file list of `dir` into memory on a worker thread, so that
+        the next getContent() for `dir` returns at once.
+        The vim variables are all read here, the worker thread only runs the
+        command, or reads the cache file, at a low priority.
+        """
+        if dir == self._cur_dir and self._content:
+            return
+        if self._prewarm_result and self._prewarm_result[0] == dir:
+            return
+        # LeaderfFile is running or the last prewarming is not finished
+        if self._executor or (self._prewarm_thread and self._prewarm_thread.is_alive()):
+            return
+
+        cmd = self._getCmd(dir, absolute_path=True)
+        if cmd is None:     # the python fallback has its own cache, see _getFileList()
+            return
+
+        cache_file = None
+        if lfEval("g:Lf_UseCache") == '1':
+            cache_file = self._getCacheFile(dir)
+
+        show_relative_path = lfEval("g:Lf_ShowRelativePath") == '1'
+        encoding = None if cmd.split(None, 1)[0] == "dir" else lfEval("&encoding")
+        self._prewarm_thread = threading.Thread(target=self._prewarmThread,
+                                                args=(dir, lfEncode(dir), cmd, cache_file,
+                                                      show_relative_path, encoding))
+        self._prewarm_thread.daemon = True
+        self._prewarm_thread.start()
+
+    def _prewarmThread(self, dir, encoded_dir, cmd, cache_file, show_relative_path, encoding):
+        """
+        run on the worker thread, MUST NOT call lfEval() or lfCmd()
+        """
+        # the share of a CPU the thread uses at most
+        cpu_budget = 0.25
+        clock = getattr(time, "thread_time", time.time)
+        start_time = clock()
+        file_list = []
+        try:
+            if cache_file:
+                with lfOpen(cache_file, 'r', errors='ignore') as f:
+                    file_list = [line.rstrip('\r\n') for line in f]
+            else:
+                if os.name == 'posix':
+                    # run the command at a low priority
+                    preexec_fn = lambda: os.nice(10)
+                else:
+                    preexec_fn = None
+                with open(os.devnull, 'w') as devnull:
+                    process = subprocess.Popen(cmd, shell=True, cwd=dir, bufsize=-1,
+                                               stdout=subprocess.PIPE, stderr=devnull,
+                                               preexec_fn=preexec_fn)
+                    for line in process.stdout:
+                        file_list.append(lfBytes2Str(line.rstrip(b'\r\n'), encoding))
+                        if len(file_list) % 10000 == 0:
+                            # sleep to keep the usage of the CPU under the budget,
+                            # the command is throttled as well since the pipe is not read
+                            busy_time = clock() - start_time
+                            time.sleep(busy_time * (1 - cpu_budget) / cpu_budget)
+                            start_time = clock()
+                    # the listing is incomplete if the command fails
+                    if process.wait() != 0:
+                        return
+        except (IOError, OSError, ValueError):
+            return
+
+        # the command is run with the absolute path of `dir`, but some tools,
+        # e.g., git, print the paths relative to the working directory
+        prefix = encoded_dir if encoded_dir.endswith(os.sep) else encoded_dir + os.sep
+        if show_relative_path:
+            prefix_len = len(prefix)
+            file_list = [line[prefix_len:] if line.startswith(prefix) else line
+                         for line in file_list]
+        else:
+            file_list = [line if os.path.isabs(line) else prefix + line
+                         for line in file_list]
+
+        self._prewarm_result = (dir, cmd, file_list, cache_file is not None)
+
     def getFreshContent(self, *args, **kwargs):
         if self._external_cmd:
             self._content = []
@@ -615,6 +714,18 @@ class FileExplManager(Manager):
         lfCmd("autocmd VimLeavePre * call leaderf#File#cleanup()")
         lfCmd("augroup END")
 
+    def _getFrecencyBoosts(self):
+        mru.flush()
+        if lfEval("g:Lf_ShowRelativePath") == '1':
+            cwd = lfEncode(os.getcwd())
+            if not cwd.endswith(os.sep):
+                cwd += os.sep
+            # os.path.relpath() is too slow!
+            to_line = lambda name: name[len(cwd):] if name.startswith(cwd) else None
+        else:
+            to_line = lambda name: name
+        return mru.getFrecencyBoosts(to_line)
+
     def _createHelp(self):
         help = []
         help.append('" <CR>/<double-click>/o : open file under cursor')
@@ -638,24 +749,39 @@ class FileExplManager(Manager):
         one of files or directories in `markers`.
         `markers` is a list of file or directory names.
         """
-        if os.name == 'nt':
-            # e.g. C:\\
-            root = os.path.splitdrive(os.path.abspath(path))[0] + os.sep
-        else:
-            root = '/'
+        return rootResolver.nearestAncestor(markers, path)
+
+    def _getWorkingDir(self, cwd, cur_buf_name):
+        """
+        return the directory to search in according to g:Lf_WorkingDirectory
+        and g:Lf_WorkingDirectoryMode, None if it is `cwd`
+        """
+        root_markers = lfEval("g:Lf_RootMarkers")
+        mode = lfEval("g:Lf_WorkingDirectoryMode")
+        working_dir = lfEval("g:Lf_WorkingDirectory")
+
+        if os.path.exists(working_dir) and os.path.isdir(working_dir):
+            return working_dir
 
-        path = os.path.abspath(path)
-        while path != root:
-            for name in markers:
-                if os.path.exists(os.path.join(path, name)):
-                    return path
-            path = os.path.abspath(os.path.join(path, ".."))
+        if 'a' in mode:
+            working_dir = self._nearestAncestor(root_markers, cwd)
+            if working_dir: # there exists a root marker in nearest ancestor path
+                return working_dir
+        elif 'A' in mode:
+            if cur_buf_name:
+                working_dir = self._nearestAncestor(root_markers, os.path.dirname(cur_buf_name))
+                if working_dir: # there exists a root marker in nearest ancestor path
+                    return working_dir
 
-        for name in markers:
-            if os.path.exists(os.path.join(path, name)):
-                return path
+        # fall back
+        if 'f' in mode:
+            if cur_buf_name:
+                return os.path.dirname(cur_buf_name)
+        elif 'F' in mode:
+            if cur_buf_name and not os.path.dirname(cur_buf_name).startswith(cwd):
+                return os.path.dirname(cur_buf_name)
 
-        return ""
+        return None
 
     def startExplorer(self, win_pos, *args, **kwargs):
         if kwargs.get("arguments", {}).get("directory"): # behavior no change for `LeaderfFile <directory>`
@@ -664,9 +790,6 @@ class FileExplManager(Manager):
             return
 
         self._orig_cwd = os.getcwd()
-        root_markers = lfEval("g:Lf_RootMarkers")
-        mode = lfEval("g:Lf_WorkingDirectoryMode")
-        working_dir = lfEval("g:Lf_WorkingDirectory")
 
         # https://github.com/neovim/neovim/issues/8336
         if lfEval("has('nvim')") == '1':
@@ -674,40 +797,23 @@ class FileExplManager(Manager):
         else:
             chdir = os.chdir
 
-        if os.path.exists(working_dir) and os.path.isdir(working_dir):
+        working_dir = self._getWorkingDir(self._orig_cwd, lfDecode(vim.current.buffer.name))
+        if working_dir:
             chdir(working_dir)
-            super(FileExplManager, self).startExplorer(win_pos, *args, **kwargs)
-            return
 
-        cur_buf_name = lfDecode(vim.current.buffer.name)
-        fall_back = False
-        if 'a' in mode:
-            working_dir = self._nearestAncestor(root_markers, self._orig_cwd)
-            if working_dir: # there exists a root marker in nearest ancestor path
-                chdir(working_dir)
-            else:
-                fall_back = True
-        elif 'A' in mode:
-            if cur_buf_name:
-                working_dir = self._nearestAncestor(root_markers, os.path.dirname(cur_buf_name))
-            else:
-                working_dir = ""
-            if working_dir: # there exists a root marker in nearest ancestor path
-                chdir(working_dir)
-            else:
-                fall_back = True
-        else:
-            fall_back = True
+        super(FileExplManager, self).startExplorer(win_pos, *args, **kwargs)
 
-        if fall_back:
-            if 'f' in mode:
-                if cur_buf_name:
-                    chdir(os.path.dirname(cur_buf_name))
-            elif 'F' in mode:
-                if cur_buf_name and not os.path.dirname(cur_buf_name).startswith(self._orig_cwd):
-                    chdir(os.path.dirname(cur_buf_name))
+    def prewarm(self, buf_name):
+        """
+        load the file list of the directory LeaderfFile would search in
+        into memory in the background, `buf_name` is the name of the current buffer
+        """
+        if lfEval("g:Lf_UseMemoryCache") == '0':
+            return
 
-        super(FileExplManager, self).startExplorer(win_pos, *args, **kwargs)
+        cwd = os.getcwd()
+        dir = self._getWorkingDir(cwd, lfDecode(buf_name)) or cwd
+        self._getExplorer().prewarm(os.path.realpath(dir))
 
     def _previewResult(self, preview):
         if not self._needPreview(preview):
@@ -12,7 +12,8 @@ import multiprocessing
 from .utils import *
 from .explorer import *
 from .manager import *
-from .asyncExecutor import AsyncExecutor
+from .asyncExecutor import AsyncExecutor, AsyncExecutorPool
+from .ctagsCache import *
 
 
 #*****************************************************
@@ -57,57 +58,62 @@ class FunctionExplorer(Explorer):
 
     def getContent(self, *args, **kwargs):
         if "--all" in kwargs.get("arguments", {}): # all buffers
-            cur_buffer = vim.current.buffer
-            for b in vim.buffers:
-                if b.options["buflisted"]:
-                    if lfEval("bufloaded(%d)" % b.number) == '0':
-                        vim.current.buffer = b
-            if vim.current.buffer != cur_buffer:
+            unloaded = lfEval("filter(range(1, bufnr('$')), 'buflisted(v:val) && !bufloaded(v:val)')")
+            if unloaded:
+                cur_buffer = vim.current.buffer
+                for nr in unloaded:
+                    vim.current.buffer = vim.buffers[int(nr)]
                 vim.current.buffer = cur_buffer
 
-            for b in vim.buffers:
-                if b.options["buflisted"] and b.name:
-                    changedtick = int(lfEval("getbufvar(%d, 'changedtick')" % b.number))
-                    if changedtick != self._buf_changedtick.get(b.number, -1):
-                        break
+            buffer_info = lfGetBufferInfo()
+            for nr, info in buffer_info.items():
+                if info[0] != self._buf_changedtick.get(nr, -1):
+                    break
             else:
                 return list(itertools.chain.from_iterable(self._func_list.values()))
 
-            return itertools.chain.from_iterable(self._getFunctionList())
+            return itertools.chain.from_iterable(self._getFunctionList(buffer_info))
         else:
-            result = self._getFunctionResult(vim.current.buffer)
+            buffer = vim.current.buffer
+            result = self._getFunctionResult(buffer, lfGetBufferInfo([buffer.number]).get(buffer.number),
+                                             lfEval("&encoding"))
             if not isinstance(result, list):
-                result = self._formatResult(*result)
+                result = self._formatResult(buffer, result)
             func_list = []
             for line in result:
                 first, second = line.rsplit("\t", 1)
                 func_list.append("{}\t[:{}".format(first, second.rsplit(":", 1)[1]))
             return func_list
 
-    def _getFunctionList(self):
-        buffers = [b for b in vim.buffers]
-        n = multiprocessing.cpu_count()
-        for i in range(0, len(vim.buffers), n):
-            func_list = []
-            exe_result = []
-            for b in buffers[i:i+n]:
-                if b.options["buflisted"] and b.name:
-                    result = self._getFunctionResult(b)
+    def _getFunctionList(self, buffer_info):
+        """
+        keep at most cpu_count ctags processes running, and yield the func list
+        of each buffer as soon as its ctags process finishes
+        """
+        # the output of ctags is decoded on the collector threads of the pool,
+        # which must not call lfEval()
+        encoding = lfEval("&encoding")
+
+        def results():
+            for b in vim.buffers:
+                if b.number in buffer_info:
+                    result = self._getFunctionResult(b, buffer_info[b.number], encoding)
                     if isinstance(result, list):
-                        func_list.extend(result)
+                        yield (None, result)
                     else:
-                        exe_result.append(result)
-            if not exe_result:
-                yield func_list
+                        yield (b, result)
+
+        pool = AsyncExecutorPool(multiprocessing.cpu_count())
+        for buffer, result in pool.imap(results()):
+            if buffer is None:
+                yield result
             else:
-                exe_taglist = (self._formatResult(*r) for r in exe_result)
-                # list can reduce the flash of screen
-                yield list(itertools.chain(func_list, itertools.chain.from_iterable(exe_taglist)))
+                yield self._formatResult(buffer, result)
 
-    def _getFunctionResult(self, buffer):
-        if not buffer.name or lfEval("bufloaded(%d)" % buffer.number) == '0':
+    def _getFunctionResult(self, buffer, info, encoding):
+        if not buffer.name or info is None:
             return []
-        changedtick = int(lfEval("getbufvar(%d, 'changedtick')" % buffer.number))
+        changedtick, filetype, modified = info
         # there is no change since last call
         if changedtick == self._buf_changedtick.get(buffer.number, -1):
             if buffer.number in self._func_list:
@@ -117,13 +123,11 @@ class FunctionExplorer(Explorer):
         else:
             self._buf_changedtick[buffer.number] = changedtick
 
-        extra_options = self._ctags_options.get(lfEval("getbufvar(%d, '&filetype')" % buffer.number), "")
+        extra_options = self._ctags_options.get(filetype, "")
 
-        executor = AsyncExecutor()
-        self._executor.append(executor)
-        if buffer.options["modified"] == True:
+        if modified:
             if sys.version_info >= (3, 0):
-                tmp_file = partial(tempfile.NamedTemporaryFile, encoding=lfEval("&encoding"))
+                tmp_file = partial(tempfile.NamedTemporaryFile, encoding=encoding)
             else:
                 tmp_file = tempfile.NamedTemporaryFile
 
@@ -133,15 +137,25 @@ class FunctionExplorer(Explorer):
                 file_name = f.name
             # {tagname}<Tab>{tagfile}<Tab>{tagaddress};"<Tab>{kind}
             cmd = '{} -n -u --fields=k {} -f- "{}"'.format(self._ctags, extra_options, lfDecode(file_name))
-            result = executor.execute(cmd, cleanup=partial(os.remove, file_name))
+            executor = AsyncExecutor()
+            self._executor.append(executor)
+            result = executor.execute(cmd, encoding=encoding, cleanup=partial(os.remove, file_name))
         else:
             cmd = '{} -n -u --fields=k {} -f- "{}"'.format(self._ctags, extra_options, lfDecode(buffer.name))
-            result = executor.execute(cmd)
+            key = ctagsCache.getKey(buffer.name, cmd)
+            cached_output = ctagsCache.get(key)
+            if cached_output is not None:
+                return self._formatResult(buffer, cached_output)
+
+            executor = AsyncExecutor()
+            self._executor.append(executor)
+            result = ctagsCache.record(key, executor.execute(cmd, encoding=encoding), executor)
 
-        return (buffer, result)
+        return result
 
     def _formatResult(self, buffer, result):
-        if not buffer.name or lfEval("bufloaded(%d)" % buffer.number) == '0':
+        # only the loaded buffers returned by lfGetBufferInfo() get here
+        if not buffer.name:
             return []
 
         # a list of [tag, file, line, kind]
@@ -238,6 +252,9 @@ class FunctionExplManager(Manager):
         lfCmd("norm! zz")
         lfCmd("setlocal cursorline! | redraw | sleep 20m | setlocal cursorline!")
 
+    def _cachesDigests(self):
+        return True
+
     def _getDigest(self, line, mode):
         """
         specify what part in the line to be processed and highlighted
@@ -283,18 +300,14 @@ class FunctionExplManager(Manager):
 
     def _afterEnter(self):
         super(FunctionExplManager, self)._afterEnter()
-        id = int(lfEval('''matchadd('Lf_hl_funcKind', '^\w')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_funcReturnType', '^\w\t\zs.\{-}\ze\s*[~]\=\w\+\W\{-}[(\[]')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_funcScope', '\w*\(<[^>]*>\)\=::')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_funcName', '^\w\t.\{-}\s*\zs[~]\=\w\+\W\{-}\ze[(\[]')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_funcDirname', '\t\zs\[.*:\d\+ \d\+]$')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_funcLineNum', ':\zs\d\+\ze \d\+]$')'''))
-        self._match_ids.append(id)
+        self._match_ids.extend(self._addMatches([
+                ('Lf_hl_funcKind', r'^\w'),
+                ('Lf_hl_funcReturnType', r'^\w\t\zs.\{-}\ze\s*[~]\=\w\+\W\{-}[(\[]'),
+                ('Lf_hl_funcScope', r'\w*\(<[^>]*>\)\=::'),
+                ('Lf_hl_funcName', r'^\w\t.\{-}\s*\zs[~]\=\w\+\W\{-}\ze[(\[]'),
+                ('Lf_hl_funcDirname', r'\t\zs\[.*:\d\+ \d\+]$'),
+                ('Lf_hl_funcLineNum', r':\zs\d\+\ze \d\+]$'),
+                ]))
 
     def _beforeExit(self):
         super(FunctionExplManager, self)._beforeExit()
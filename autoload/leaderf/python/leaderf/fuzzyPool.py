@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import multiprocessing
+from .utils import *
+from .fuzzyMatch import FuzzyMatch
+
+
+# the FuzzyMatch objects of the worker process, {(pattern, encoding): FuzzyMatch}
+_fuzzy_matches = {}
+
+def _getWeights(args):
+    """
+    run in the worker process,
+    return a tuple (weights, indices) of the items of `texts` that match `pattern`
+    """
+    pattern, encoding, method, texts = args
+    fuzzy_match = _fuzzy_matches.get((pattern, encoding))
+    if fuzzy_match is None:
+        _fuzzy_matches.clear()
+        fuzzy_match = FuzzyMatch(pattern, encoding)
+        _fuzzy_matches[(pattern, encoding)] = fuzzy_match
+
+    get_weight = getattr(fuzzy_match, method)
+    MIN_WEIGHT = FuzzyMatch.MIN_WEIGHT
+    weights = []
+    indices = []
+    for i, text in enumerate(texts):
+        weight = get_weight(text)
+        if weight > MIN_WEIGHT:
+            weights.append(weight)
+            indices.append(i)
+    return (weights, indices)
+
+
+#*****************************************************
+# FuzzyPool
+#*****************************************************
+class FuzzyPool(object):
+    """
+    A pool of worker processes that compute the weights of FuzzyMatch,
+    it is used only if neither fuzzyEngine nor fuzzyMatchC is available.
+    The processes are forked when the module is imported, i.e., before any
+    thread of LeaderF is started, since forking a multithreaded process may
+    deadlock the children, and they are kept until vim exits.
+    """
+    def __init__(self):
+        self._process_count = 0
+        self._pool = None
+        count = int(lfEval("g:Lf_FuzzyProcessCount"))
+        # the workers must be forked, vim can not be spawned as a python interpreter
+        if count > 1 and os.name == 'posix':
+            self._pool = self._createPool(count)
+            if self._pool is not None:
+                self._process_count = count
+
+    def _createPool(self, count):
+        """
+        return a pool of `count` forked processes, None if it can not be created
+        """
+        try:
+            if sys.version_info >= (3, 4):
+                return multiprocessing.get_context("fork").Pool(count)
+            else:
+                return multiprocessing.Pool(count)
+        except (OSError, ValueError):
+            return None
+
+    def isEnabled(self):
+        return self._process_count > 1
+
+    def getProcessCount(self):
+        return self._process_count
+
+    def getWeights(self, pattern, encoding, method, texts):
+        """
+        return a tuple (weights, indices) of the items of `texts` that match `pattern`,
+        None if the pool is not available
+        Args:
+            method: the name of the method of FuzzyMatch used to compute the weight,
+                    i.e., getWeight, getWeight2 or getWeight3
+        """
+        if self._pool is None:
+            return None
+
+        if not texts:
+            return ([], [])
+
+        chunk_size = (len(texts) + self._process_count - 1) // self._process_count
+        tasks = [(pattern, encoding, method, texts[i:i + chunk_size])
+                 for i in range(0, len(texts), chunk_size)]
+        weights = []
+        indices = []
+        for n, result in enumerate(self._pool.map(_getWeights, tasks)):
+            offset = n * chunk_size
+            weights.extend(result[0])
+            indices.extend(i + offset for i in result[1])
+        return (weights, indices)
+
+
+#*****************************************************
+# fuzzyPool is a singleton
+#*****************************************************
+fuzzyPool = FuzzyPool()
+
+__all__ = ['fuzzyPool']
@@ -4,6 +4,8 @@
 import vim
 import os
 import re
+import sys
+import hashlib
 import os.path
 from leaderf.utils import *
 from leaderf.explorer import *
@@ -14,8 +16,18 @@ from leaderf.manager import *
 # HelpExplorer
 #*****************************************************
 class HelpExplorer(Explorer):
+    # the tag and the file name of each line of a tags file
+    _tag_re = re.compile(r"^(\S+)\s+(\S+)", re.M)
+    _quote_re = re.compile(r"'([^']+)'")
+
     def __init__(self):
         self._content = []
+        self._cache_dir = os.path.join(lfEval("g:Lf_CacheDirectory"),
+                                       '.LfCache',
+                                       'python' + lfEval("g:Lf_PythonVersion"),
+                                       'help')
+        if not os.path.exists(self._cache_dir):
+            os.makedirs(self._cache_dir)
 
     def getContent(self, *args, **kwargs):
         if self._content:
@@ -25,21 +37,84 @@ class HelpExplorer(Explorer):
 
     def getFreshContent(self, *args, **kwargs):
         self._content = []
-        lfCmd("silent! helptags ALL")
         for dir in lfEval("&rtp").split(','):
-            tags_file = os.path.join(dir, "doc", "tags")
-            try:
-                with lfOpen(tags_file, 'r+', errors='ignore') as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        tag, file = line.split()[:2]
-                        tag = re.sub("'([^']+)'", r"\1", tag)    # remove ''
-                        self._content.append("{:<40} {}".format(tag, file))
-            except IOError:
-                pass
+            self._content.extend(self._getDocContent(os.path.join(dir, "doc")))
 
         return self._content
 
+    def _getDocContent(self, doc_dir):
+        """
+        return the lines of the help tags in `doc_dir`,
+        `helptags` is executed only if the help files are newer than the tags file,
+        and the lines are parsed again only if the tags file has changed.
+        """
+        try:
+            names = os.listdir(lfDecode(doc_dir))
+        except OSError:
+            return []
+
+        doc_mtime = 0
+        tags_stat = None
+        for name in names:
+            if name == "tags":
+                try:
+                    tags_stat = os.stat(os.path.join(lfDecode(doc_dir), name))
+                except OSError:
+                    pass
+            elif name.endswith(".txt") or re.search(r"\.\w\wx$", name):
+                try:
+                    doc_mtime = max(doc_mtime, os.path.getmtime(os.path.join(lfDecode(doc_dir), name)))
+                except OSError:
+                    pass
+
+        if doc_mtime == 0 and tags_stat is None:
+            return []
+
+        tags_file = os.path.join(doc_dir, "tags")
+        if tags_stat is None or tags_stat.st_mtime < doc_mtime:
+            lfCmd("silent! helptags %s" % escSpecial(doc_dir))
+            try:
+                tags_stat = os.stat(lfDecode(tags_file))
+            except OSError:
+                return []
+
+        signature = "%r\t%r\t%d" % (doc_mtime, tags_stat.st_mtime, tags_stat.st_size)
+        cache_file = os.path.join(self._cache_dir, self._getCacheName(doc_dir))
+        try:
+            with lfOpen(cache_file, 'r', errors='ignore') as f:
+                if f.readline().rstrip('\n') == signature:
+                    return [line.rstrip('\n') for line in f]
+        except IOError:
+            pass
+
+        try:
+            with lfOpen(tags_file, 'r', errors='ignore') as f:
+                text = f.read()
+        except IOError:
+            return []
+
+        content = []
+        for tag, file in self._tag_re.findall(text):
+            if "'" in tag:
+                tag = self._quote_re.sub(r"\1", tag)    # remove ''
+            content.append("{:<40} {}".format(tag, file))
+
+        try:
+            with lfOpen(cache_file, 'w', errors='ignore') as f:
+                f.write(signature + '\n')
+                for line in content:
+                    f.write(line + '\n')
+        except IOError:
+            pass
+
+        return content
+
+    def _getCacheName(self, doc_dir):
+        if sys.version_info >= (3, 0):
+            return hashlib.md5(doc_dir.encode("utf-8", errors="ignore")).hexdigest()
+        else:
+            return hashlib.md5(doc_dir).hexdigest()
+
     def getStlCategory(self):
         return "Help"
 
@@ -31,6 +31,7 @@ class LfInstance(object):
         self._tabpage_object = None
         self._window_object = None
         self._buffer_object = None
+        self._stl_cache = {}    # {reverse_order: statusline}
         self._buffer_name = lfEval("expand('$VIMRUNTIME/')") + category + '/LeaderF'
         self._win_height = float(lfEval("g:Lf_WindowHeight"))
         self._show_tabline = int(lfEval("&showtabline"))
@@ -42,13 +43,14 @@ class LfInstance(object):
         self._highlightStl()
 
     def _initStlVar(self):
-        lfCmd("let g:Lf_{}_StlCategory = '-'".format(self._category))
-        lfCmd("let g:Lf_{}_StlMode = '-'".format(self._category))
-        lfCmd("let g:Lf_{}_StlCwd= '-'".format(self._category))
-        lfCmd("let g:Lf_{}_StlRunning = ':'".format(self._category))
-        lfCmd("let g:Lf_{}_StlTotal = '0'".format(self._category))
-        lfCmd("let g:Lf_{}_StlLineNumber = '1'".format(self._category))
-        lfCmd("let g:Lf_{}_StlResultsCount = '0'".format(self._category))
+        lfCmd("let g:Lf_{0}_StlCategory = '-' | let g:Lf_{0}_StlMode = '-' | let g:Lf_{0}_StlCwd= '-'"
+              " | let g:Lf_{0}_StlRunning = ':' | let g:Lf_{0}_StlTotal = '0'"
+              " | let g:Lf_{0}_StlLineNumber = '1' | let g:Lf_{0}_StlResultsCount = '0'"
+              .format(self._category))
+
+        if self._reverse_order in self._stl_cache:
+            self._stl = self._stl_cache[self._reverse_order]
+            return
 
         stl = "%#Lf_hl_{0}_stlName# LeaderF "
         stl += "%#Lf_hl_{0}_stlSeparator0#%{{g:Lf_StlSeparator.left}}"
@@ -67,33 +69,25 @@ class LfInstance(object):
         stl += "%#Lf_hl_{0}_stlSeparator5#%{{g:Lf_StlSeparator.right}}"
         stl += "%#Lf_hl_{0}_stlTotal# Total%{{g:Lf_{0}_StlRunning}} %{{g:Lf_{0}_StlTotal}} "
         self._stl = stl.format(self._category)
+        self._stl_cache[self._reverse_order] = self._stl
 
     def _highlightStl(self):
         lfCmd("call leaderf#colorscheme#highlight('{}')".format(self._category))
 
     def _setAttributes(self):
-        lfCmd("setlocal nobuflisted")
-        lfCmd("setlocal buftype=nofile")
-        lfCmd("setlocal bufhidden=hide")
-        lfCmd("setlocal undolevels=-1")
-        lfCmd("setlocal noswapfile")
-        lfCmd("setlocal nolist")
-        lfCmd("setlocal norelativenumber")
-        lfCmd("setlocal nospell")
-        lfCmd("setlocal wrap")
-        lfCmd("setlocal nofoldenable")
-        lfCmd("setlocal foldmethod=manual")
-        lfCmd("setlocal shiftwidth=4")
-        lfCmd("setlocal cursorline")
+        # the window is new each time, the window-local options are set in one go
         if self._reverse_order:
-            lfCmd("setlocal nonumber")
-            lfCmd("setlocal foldcolumn=1")
-            lfCmd("setlocal winfixheight")
+            lfCmd("setlocal nolist norelativenumber nospell wrap nofoldenable foldmethod=manual"
+                  " cursorline nonumber foldcolumn=1 winfixheight")
         else:
-            lfCmd("setlocal number")
-            lfCmd("setlocal foldcolumn=0")
-            lfCmd("setlocal nowinfixheight")
-        lfCmd("setlocal filetype=leaderf")
+            lfCmd("setlocal nolist norelativenumber nospell wrap nofoldenable foldmethod=manual"
+                  " cursorline number foldcolumn=0 nowinfixheight")
+
+        # the buffer is reused, its options and filetype(and so the syntax) are set only
+        # if the buffer does not keep them, i.e., the first time or after :bdelete or :bunload
+        lfCmd("if &buftype !=# 'nofile' || &filetype !=# 'leaderf'"
+              " | setlocal nobuflisted buftype=nofile bufhidden=hide undolevels=-1 noswapfile shiftwidth=4"
+              " | setlocal filetype=leaderf | endif")
 
     def _setStatusline(self):
         self._initStlVar()
@@ -337,9 +331,12 @@ class LfInstance(object):
 
     def _actualLength(self, buffer):
         num = 0
-        columns = int(lfEval("&columns"))
+        columns, ambiwidth, encoding = lfEval("[&columns, &ambiwidth, &encoding]")
+        columns = int(columns)
+        ambiwidth = 2 if ambiwidth == "double" else 1
+        tabstop = int(buffer.options['tabstop'])
         for i in buffer:
-            num += (int(lfEval("strdisplaywidth('%s')" % escQuote(i))) + columns - 1)// columns
+            num += (lfDisplayWidth(i, ambiwidth, tabstop, encoding) + columns - 1)// columns
         return num
 
     def setBuffer(self, content):
@@ -14,31 +14,97 @@ from .manager import *
 #*****************************************************
 class LineExplorer(Explorer):
     def __init__(self):
-        pass
+        # {buffer number: (key, line list)}
+        self._line_cache = {}
 
     def getContent(self, *args, **kwargs):
-        line_list = []
         if "--all" in kwargs.get("arguments", {}): # all buffers
-            cur_buffer = vim.current.buffer
-            for b in vim.buffers:
-                if b.options["buflisted"]:
-                    if lfEval("bufloaded(%d)" % b.number) == '0':
-                        lfCmd("silent hide buffer %d" % b.number)
-                    line_list.extend(self._getLineList(b))
-            if vim.current.buffer != cur_buffer:
-                vim.current.buffer = cur_buffer
+            buffers = lfEval("map(filter(range(1, bufnr('$')), 'buflisted(v:val)'), "
+                             "'[v:val, bufloaded(v:val), getbufvar(v:val, \"changedtick\"),"
+                             " getbufvar(v:val, \"&fileencoding\")]')")
         else:
-            line_list = self._getLineList(vim.current.buffer)
+            buffers = [[str(vim.current.buffer.number), '1', lfEval("b:changedtick"), '']]
+
+        cur_buffer = vim.current.buffer
+        line_list = []
+        line_cache = {}
+        for nr, loaded, changedtick, fileencoding in buffers:
+            nr = int(nr)
+            buffer = vim.buffers[nr]
+            if loaded == '1':
+                key = (buffer.name, changedtick)
+            else:
+                try:
+                    st = os.stat(lfDecode(buffer.name))
+                    key = (buffer.name, st.st_mtime, st.st_size)
+                except OSError:
+                    continue
+
+            entry = self._line_cache.get(nr)
+            if entry is not None and entry[0] == key:
+                lines = entry[1]
+            elif loaded == '1':
+                lines = self._getLineList(buffer)
+            else:
+                lines = self._getFileLineList(buffer, fileencoding)
+                if lines is None:
+                    # the file is not in utf-8, let vim detect its encoding
+                    lfCmd("silent hide buffer %d" % nr)
+                    lines = self._getLineList(buffer)
+
+            line_cache[nr] = (key, lines)
+            line_list.extend(lines)
+
+        if vim.current.buffer != cur_buffer:
+            vim.current.buffer = cur_buffer
+
+        # the entries of the buffers that have been deleted are dropped
+        self._line_cache = line_cache
         return line_list
 
     def _getLineList(self, buffer):
-        bufname = os.path.basename(buffer.name)
+        lines = buffer[:]
         if sys.version_info >= (3, 0):
-            return ["%s\t[%s:%d %d]" % (line.encode('utf-8', "replace").decode('utf-8', "replace"), bufname, i, buffer.number)
-                    for i, line in enumerate(buffer, 1) if line and not line.isspace()]
-        else:
-            return ["%s\t[%s:%d %d]" % (line, bufname, i, buffer.number)
-                    for i, line in enumerate(buffer, 1) if line and not line.isspace()]
+            try:
+                # one pass over all the lines, it fails only if there are surrogates
+                "\n".join(lines).encode('utf-8')
+            except UnicodeEncodeError:
+                lines = [line.encode('utf-8', "replace").decode('utf-8', "replace") for line in lines]
+        return self._formatLines(lines, buffer)
+
+    def _getFileLineList(self, buffer, fileencoding):
+        """
+        read the lines of an unloaded buffer from its file, instead of loading
+        the buffer, the file is decoded with `fileencoding` if it is set,
+        otherwise it must be in utf-8, return None if it can not be decoded
+        """
+        try:
+            with open(lfDecode(buffer.name), 'rb') as f:
+                data = f.read()
+        except IOError:
+            return []
+
+        try:
+            if fileencoding:
+                text = data.decode(fileencoding, 'replace')
+            else:
+                text = data.decode('utf-8-sig')
+        except (UnicodeDecodeError, LookupError):
+            return None
+
+        if sys.version_info < (3, 0):
+            text = text.encode(lfEval("&encoding"), 'replace')
+
+        lines = [line.rstrip('\r') for line in text.split('\n')]
+        if lines[-1] == '':
+            del lines[-1]
+        return self._formatLines(lines, buffer)
+
+    def _formatLines(self, lines, buffer):
+        bufname = os.path.basename(buffer.name)
+        nr = buffer.number
+        return ["%s\t[%s:%d %d]" % (line, bufname, i, nr)
+                for i, line in enumerate(lines, 1) if line and not line.isspace()]
 
     def getStlCategory(self):
         return 'Line'
@@ -72,6 +138,9 @@ class LineExplManager(Manager):
         lfCmd("norm! zz")
         lfCmd("setlocal cursorline! | redraw | sleep 20m | setlocal cursorline!")
 
+    def _cachesDigests(self):
+        return True
+
     def _getDigest(self, line, mode):
         """
         specify what part in the line to be processed and highlighted
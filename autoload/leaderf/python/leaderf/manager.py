@@ -3,6 +3,7 @@
 
 import vim
 import os
+import re
 import sys
 import time
 import operator
@@ -14,8 +15,11 @@ from functools import wraps
 from .instance import LfInstance
 from .cli import LfCli
 from .utils import *
+from .config import *
 from .fuzzyMatch import FuzzyMatch
 from .asyncExecutor import AsyncExecutor
+from .fuzzyPool import *
+from .tracer import *
 
 is_fuzzyEngine_C = False
 try:
@@ -34,6 +38,34 @@ try:
 except ImportError:
     lfCmd("let g:Lf_fuzzyMatch_C = 0")
 
+_fuzzy_engine = None
+_fuzzy_engine_threads = 0
+
+def getFuzzyEngine():
+    """
+    return the fuzzyEngine object shared by all the managers,
+    its threads are created on first use and kept until vim exits
+    """
+    global _fuzzy_engine, _fuzzy_engine_threads
+    if _fuzzy_engine is None:
+        thread_count = int(lfEval("g:Lf_FuzzyEngineThreads")) or cpu_count
+        _fuzzy_engine_threads = thread_count
+        if lfEval("g:Lf_FuzzyEngineAffinity") == '1':
+            try:
+                _fuzzy_engine = fuzzyEngine.createFuzzyEngine(thread_count, True, True)
+            except TypeError:   # the extension is built from an older source
+                _fuzzy_engine = fuzzyEngine.createFuzzyEngine(thread_count, True)
+        else:
+            _fuzzy_engine = fuzzyEngine.createFuzzyEngine(thread_count, True)
+    return _fuzzy_engine
+
+def getFuzzyEngineThreads():
+    """
+    return the number of the threads of the engine returned by getFuzzyEngine(),
+    the batches fed to the engine are sized by it
+    """
+    return _fuzzy_engine_threads
+
 if sys.version_info >= (3, 0):
     def isAscii(str):
         try:
@@ -73,7 +105,9 @@ class Manager(object):
         self._index = 0
         self._help_length = 0
         self._show_help = False
-        self._selections = {}
+        self._selections = set()    # the indices of the selected results
+        self._selection_match_id = None
+        self._selection_range = None   # (first line, last line, buffer length) highlighted
         self._highlight_pos = []
         self._highlight_pos_list = []
         self._highlight_refine_pos = []
@@ -87,6 +121,9 @@ class Manager(object):
         self._timer_id = None
         self._highlight_method = lambda : None
         self._orig_cwd = None
+        self._frecency_boosts = None
+        self._regex = None
+        self._digest_cache = {}     # {mode: {line: digest}}
         self._getExplClass()
 
     #**************************************************************
@@ -113,8 +150,10 @@ class Manager(object):
     def _argaddFiles(self, files):
         # It will raise E480 without 'silent!'
         lfCmd("silent! argdelete *")
-        for file in files:
-            lfCmd("argadd %s" % escSpecial(file))
+        # one argadd per chunk instead of per file, the files are not loaded until edited
+        chunk_size = 1000
+        for i in range(0, len(files), chunk_size):
+            lfCmd("argadd %s" % " ".join(escSpecial(file) for file in files[i:i+chunk_size]))
 
     def _acceptSelection(self, *args, **kwargs):
         if len(args) == 0:
@@ -150,6 +189,45 @@ class Manager(object):
         else:
             return getDirname(line)
 
+    def _cachesDigests(self):
+        """
+        this function can be overridden
+        return True if _getDigest() parses the line, e.g., Rg, Line and Tag,
+        then each digest is computed once and reused in the later searches
+        """
+        return False
+
+    def _getDigestFunc(self, mode):
+        """
+        return a function that returns the digest of a line in `mode`
+        """
+        getDigest = self._getDigest
+        if not self._cachesDigests():
+            return lambda line: getDigest(line, mode)
+
+        cache = self._digest_cache.setdefault(mode, {})
+        def digest(line):
+            try:
+                return cache[line]
+            except KeyError:
+                cache[line] = result = getDigest(line, mode)
+                return result
+        return digest
+
+    def _getDigests(self, lines, mode):
+        """
+        return a list of the digests of `lines` in `mode`
+        """
+        if self._cachesDigests():
+            cache = self._digest_cache.get(mode)
+            if cache is not None:
+                try:
+                    return [cache[line] for line in lines]
+                except KeyError:
+                    pass
+        digest = self._getDigestFunc(mode)
+        return [digest(line) for line in lines]
+
     def _getDigestStartPos(self, line, mode):
         """
         this function can be overridden
@@ -167,6 +245,14 @@ class Manager(object):
     def _createHelp(self):
         return []
 
+    def _getFrecencyBoosts(self):
+        """
+        this function can be overridden
+        return a dict with (key, value) = (line, boost), the boost is added
+        to the weight of the line when fuzzy searching
+        """
+        return {}
+
     def _setStlMode(self, **kwargs):
         if self._cli.isFuzzy:
             if self._getExplorer().supportsNameOnly():
@@ -210,16 +296,31 @@ class Manager(object):
             self._getInstance().window.options['wrap'] = False
         self._cleanup()
         self._defineMaps()
-        lfCmd("runtime syntax/leaderf.vim")
+        # the syntax is kept by the buffer, it is loaded only the first time
+        lfCmd("if !exists('b:current_syntax') | runtime syntax/leaderf.vim | endif")
         if is_fuzzyEngine_C:
-            self._fuzzy_engine = fuzzyEngine.createFuzzyEngine(cpu_count, False)
+            self._fuzzy_engine = getFuzzyEngine()
+
+    def _addMatches(self, matches):
+        """
+        add the matches to the current window in one lfEval(), return their ids
+        Args:
+            matches: a list of tuple(group, pattern) or tuple(group, pattern, priority)
+        """
+        exprs = []
+        for match in matches:
+            if len(match) > 2:
+                exprs.append("matchadd('%s', '%s', %d)" % (match[0], escQuote(match[1]), match[2]))
+            else:
+                exprs.append("matchadd('%s', '%s')" % (match[0], escQuote(match[1])))
+        return [int(i) for i in lfEval("[%s]" % ", ".join(exprs))]
 
     def _beforeExit(self):
         self._cleanup()
         self._getExplorer().cleanup()
-        if self._fuzzy_engine:
-            fuzzyEngine.closeFuzzyEngine(self._fuzzy_engine)
-            self._fuzzy_engine = None
+        self._digest_cache = {}
+        # the engine is shared, its threads are kept for the next time
+        self._fuzzy_engine = None
 
         if self._reader_thread and self._reader_thread.is_alive():
             self._stop_reader_thread = True
@@ -238,9 +339,20 @@ class Manager(object):
         this function can be overridden
         return a list constructed from pairs
         Args:
-            pairs: a list of tuple(weight, line, ...)
+            pairs: a list of tuple(weight, line, ...), if _getUnit() > 1,
+                   line is a tuple of the lines of a unit
+        """
+        if self._getUnit() > 1:
+            return list(itertools.chain.from_iterable(p[1] for p in pairs))
+        else:
+            return [p[1] for p in pairs]
+
+    def _getUnits(self, content):
         """
-        return [p[1] for p in pairs]
+        return a list of tuples, each of which is the lines of a unit
+        """
+        unit = self._getUnit()
+        return [tuple(content[i:i + unit]) for i in range(0, len(content) - unit + 1, unit)]
 
     def _getUnit(self):
         """
@@ -386,7 +498,7 @@ class Manager(object):
             self._setResultContent()
             if self._cli.pattern and self._cli.isFuzzy \
                     and len(self._highlight_pos) < (len(self._getInstance().buffer) - self._help_length) // self._getUnit() \
-                    and len(self._highlight_pos) < int(lfEval("g:Lf_NumberOfHighlight")):
+                    and len(self._highlight_pos) < lfConfig.number_of_highlight:
                 self._highlight_method()
 
         lfCmd("norm! k")
@@ -394,6 +506,7 @@ class Manager(object):
         if adjust:
             lfCmd("norm! zt")
 
+        self.updateSelections()
         self._getInstance().setLineNumber()
         lfCmd("setlocal cursorline!")   # these two help to redraw the statusline,
         lfCmd("setlocal cursorline!")   # also fix a weird bug of vim
@@ -404,6 +517,7 @@ class Manager(object):
             self._setResultContent()
 
         lfCmd("norm! j")
+        self.updateSelections()
         self._getInstance().setLineNumber()
         lfCmd("setlocal cursorline!")   # these two help to redraw the statusline,
         lfCmd("setlocal cursorline!")   # also fix a weird bug of vim
@@ -413,11 +527,12 @@ class Manager(object):
             self._setResultContent()
             if self._cli.pattern and self._cli.isFuzzy \
                     and len(self._highlight_pos) < (len(self._getInstance().buffer) - self._help_length) // self._getUnit() \
-                    and len(self._highlight_pos) < int(lfEval("g:Lf_NumberOfHighlight")):
+                    and len(self._highlight_pos) < lfConfig.number_of_highlight:
                 self._highlight_method()
 
         lfCmd('exec "norm! \<PageUp>"')
 
+        self.updateSelections()
         self._getInstance().setLineNumber()
 
     def _pageDown(self):
@@ -426,6 +541,7 @@ class Manager(object):
 
         lfCmd('exec "norm! \<PageDown>"')
 
+        self.updateSelections()
         self._getInstance().setLineNumber()
 
     def _leftClick(self):
@@ -446,18 +562,22 @@ class Manager(object):
         self._clearHighlightsPos()
         self._cli.highlightMatches()
         if not self._cli.pattern:   # e.g., when <BS> or <Del> is typed
-            self._getInstance().setBuffer(content[:self._initial_count])
+            with tracer.span("LfInstance.setBuffer", lines=min(len(content), self._initial_count)):
+                self._getInstance().setBuffer(content[:self._initial_count])
             self._getInstance().setStlResultsCount(len(content))
             self._result_content = []
             return
 
-        if self._cli.isFuzzy:
-            self._fuzzySearch(content, is_continue, step)
-        else:
-            self._regexSearch(content, is_continue, step)
+        with tracer.span("Manager._search", candidates=len(content)) as args:
+            if self._cli.isFuzzy:
+                self._fuzzySearch(content, is_continue, step)
+            else:
+                self._regexSearch(content, is_continue, step)
+            args["results"] = len(self._result_content)
 
         if self._getExplorer().getStlCategory() not in ["File"]:
-            self._previewResult(False)
+            with tracer.span("Manager._previewResult"):
+                self._previewResult(False)
 
     def _filter(self, step, filter_method, content, is_continue,
                 use_fuzzy_engine=False, return_index=False):
@@ -505,9 +625,13 @@ class Manager(object):
         elif use_fuzzy_engine:
             if return_index:
                 mode = 0 if self._cli.isFullPath else 1
-                tmp_content = [self._getDigest(line, mode) for line in cur_content]
+                tmp_content = self._getDigests(cur_content[::unit], mode)
                 result = filter_method(source=tmp_content)
-                result = (result[0], [cur_content[i] for i in result[1]])
+                if unit > 1:
+                    units = self._getUnits(cur_content)
+                    result = (result[0], [units[i] for i in result[1]])
+                else:
+                    result = (result[0], [cur_content[i] for i in result[1]])
             else:
                 result = filter_method(source=cur_content)
 
@@ -529,10 +653,14 @@ class Manager(object):
 
     def _fuzzyFilter(self, is_full_path, get_weight, iterable):
         """
-        return a list, each item is a pair (weight, line)
+        return a list, each item is a pair (weight, line),
+        if _getUnit() > 1, line is a tuple of the lines of a unit
         """
-        getDigest = partial(self._getDigest, mode=0 if is_full_path else 1)
-        pairs = ((get_weight(getDigest(line)), line) for line in iterable)
+        getDigest = self._getDigestFunc(0 if is_full_path else 1)
+        if self._getUnit() > 1:
+            pairs = ((get_weight(getDigest(u[0])), u) for u in self._getUnits(iterable))
+        else:
+            pairs = ((get_weight(getDigest(line)), line) for line in iterable)
         MIN_WEIGHT = fuzzyMatchC.MIN_WEIGHT if is_fuzzyMatch_C else FuzzyMatch.MIN_WEIGHT
         return (p for p in pairs if p[0] > MIN_WEIGHT)
 
@@ -540,8 +668,8 @@ class Manager(object):
         """
         return a tuple, (weights, indices)
         """
-        getDigest = partial(self._getDigest, mode=0 if is_full_path else 1)
-        if self._getUnit() > 1: # currently, only BufTag's _getUnit() is 2
+        getDigest = self._getDigestFunc(0 if is_full_path else 1)
+        if self._getUnit() > 1:
             iterable = itertools.islice(iterable, 0, None, self._getUnit())
         pairs = ((get_weight(getDigest(line)), i) for i, line in enumerate(iterable))
         MIN_WEIGHT = fuzzyMatchC.MIN_WEIGHT if is_fuzzyMatch_C else FuzzyMatch.MIN_WEIGHT
@@ -552,22 +680,69 @@ class Manager(object):
             weights, indices = zip(*result)
         return (list(weights), list(indices))
 
+    def _fuzzyFilterPool(self, is_full_path, weight_method, iterable):
+        """
+        the same as _fuzzyFilter(), but the weights are computed
+        by the worker processes of fuzzyPool
+        """
+        unit = self._getUnit()
+        result = fuzzyPool.getWeights(self._cli.pattern, lfConfig.encoding, weight_method,
+                                      self._getDigests(iterable[::unit], 0 if is_full_path else 1))
+        if result is None:
+            fuzzy_match = FuzzyMatch(self._cli.pattern, lfConfig.encoding)
+            return self._fuzzyFilter(is_full_path, getattr(fuzzy_match, weight_method), iterable)
+
+        weights, indices = result
+        if unit > 1:
+            units = self._getUnits(iterable)
+            return zip(weights, [units[i] for i in indices])
+        else:
+            return zip(weights, [iterable[i] for i in indices])
+
     def _refineFilter(self, first_get_weight, get_weight, iterable):
-        getDigest = self._getDigest
-        triples = ((first_get_weight(getDigest(line, 1)),
-                    get_weight(getDigest(line, 2)), line)
-                    for line in iterable)
+        getDigest1 = self._getDigestFunc(1)
+        getDigest2 = self._getDigestFunc(2)
+        if self._getUnit() > 1:
+            triples = ((first_get_weight(getDigest1(u[0])),
+                        get_weight(getDigest2(u[0])), u)
+                        for u in self._getUnits(iterable))
+        else:
+            triples = ((first_get_weight(getDigest1(line)),
+                        get_weight(getDigest2(line)), line)
+                        for line in iterable)
         MIN_WEIGHT = fuzzyMatchC.MIN_WEIGHT if is_fuzzyMatch_C else FuzzyMatch.MIN_WEIGHT
         return ((i[0] + i[1], i[2]) for i in triples if i[0] > MIN_WEIGHT and i[1] > MIN_WEIGHT)
 
+    def _refineFilterEx(self, pattern_0, pattern_1, iterable):
+        """
+        the same as _refineFilter(), but the weights are computed
+        by fuzzyEngine.fuzzyMatchRefine() in the threads of the engine
+        """
+        unit = self._getUnit()
+        lines = iterable[::unit]
+        weights, indices = fuzzyEngine.fuzzyMatchRefine(engine=self._fuzzy_engine,
+                                                        source=self._getDigests(lines, 1),
+                                                        source2=self._getDigests(lines, 2),
+                                                        pattern=pattern_0, pattern2=pattern_1,
+                                                        sort_results=False)
+        if unit > 1:
+            units = self._getUnits(iterable)
+            return zip(weights, [units[i] for i in indices])
+        else:
+            return zip(weights, [iterable[i] for i in indices])
+
     def _andModeFilter(self, iterable):
-        encoding = lfEval("&encoding")
+        if (self._fuzzy_engine and hasattr(fuzzyEngine, "fuzzyMatchAll")
+                and isAscii(''.join(self._cli.pattern))):
+            return self._andModeFilterAll(iterable)
+
+        encoding = lfConfig.encoding
         use_fuzzy_engine = False
         cur_content = iterable
         weight_lists = []
         highlight_methods = []
         for p in self._cli.pattern:
-            if self._fuzzy_engine and isAscii(p) and self._getUnit() == 1: # currently, only BufTag's _getUnit() is 2
+            if self._fuzzy_engine and isAscii(p):
                 use_fuzzy_engine = True
                 pattern = fuzzyEngine.initPattern(p)
                 if self._getExplorer().getStlCategory() == "File" and self._cli.isFullPath:
@@ -618,7 +793,7 @@ class Manager(object):
 
             if use_fuzzy_engine:
                 mode = 0 if self._cli.isFullPath else 1
-                tmp_content = [self._getDigest(line, mode) for line in cur_content]
+                tmp_content = self._getDigests(cur_content[::self._getUnit()], mode)
                 result = filter_method(source=tmp_content)
             else:
                 result = filter_method(cur_content)
@@ -627,7 +802,7 @@ class Manager(object):
                 weight_lists[i] = [wl[j] for j in result[1]]
 
             weight_lists.append(result[0])
-            if self._getUnit() > 1: # currently, only BufTag's _getUnit() is 2
+            if self._getUnit() > 1:
                 unit = self._getUnit()
                 result_content = [cur_content[i*unit:i*unit + unit] for i in result[1]]
                 cur_content = list(itertools.chain.from_iterable(result_content))
@@ -641,10 +816,56 @@ class Manager(object):
 
         return ((weights, result_content), highlight_methods)
 
+    def _andModeFilterAll(self, iterable):
+        """
+        the same as _andModeFilter(), but all the patterns are matched
+        in one pass by fuzzyEngine.fuzzyMatchAll()
+        """
+        patterns = [fuzzyEngine.initPattern(p) for p in self._cli.pattern]
+        if self._getExplorer().getStlCategory() == "File" and self._cli.isFullPath:
+            is_name_only = False
+        elif self._getExplorer().getStlCategory() in ["Self", "Buffer", "Mru", "BufTag",
+                "Function", "History", "Cmd_History", "Search_History", "Tag", "Rg"]:
+            is_name_only = True
+        else:
+            is_name_only = not self._cli.isFullPath
+
+        unit = self._getUnit()
+        mode = 0 if self._cli.isFullPath else 1
+        tmp_content = self._getDigests(iterable[::unit], mode)
+        weights, indices = fuzzyEngine.fuzzyMatchAll(engine=self._fuzzy_engine, source=tmp_content,
+                                                     patterns=patterns, is_name_only=is_name_only,
+                                                     sort_results=False)
+        if unit > 1:
+            units = self._getUnits(iterable)
+            result_content = [units[i] for i in indices]
+        else:
+            result_content = [iterable[i] for i in indices]
+
+        highlight_methods = []
+        for pattern in patterns:
+            getHighlights = partial(fuzzyEngine.getHighlights, engine=self._fuzzy_engine,
+                                    pattern=pattern, is_name_only=not self._cli.isFullPath)
+            highlight_methods.append(partial(self._highlight, self._cli.isFullPath, getHighlights,
+                                             True, clear=False))
+
+        return ((weights, result_content), highlight_methods)
+
     def _fuzzySearch(self, content, is_continue, step):
-        encoding = lfEval("&encoding")
+        if self._frecency_boosts is None:
+            self._frecency_boosts = self._getFrecencyBoosts()
+        boosts = self._frecency_boosts
+        if boosts:
+            get_boost = boosts.get
+            sort_key = lambda p: p[0] + get_boost(p[1], 0)
+        else:
+            sort_key = operator.itemgetter(0)
+
+        encoding = lfConfig.encoding
         use_fuzzy_engine = False
         use_fuzzy_match_c = False
+        use_refine_engine = False
+        use_fuzzy_pool = False
         if self._cli.isAndMode:
             filter_method = self._andModeFilter
         elif self._cli.isRefinement:
@@ -719,10 +940,17 @@ class Manager(object):
 
                     use_fuzzy_match_c = is_ascii_0 and is_ascii_1
 
-                filter_method = partial(self._refineFilter, getWeight_0, getWeight_1)
+                if (self._fuzzy_engine and hasattr(fuzzyEngine, "fuzzyMatchRefine")
+                        and isAscii(''.join(self._cli.pattern))):
+                    use_refine_engine = True
+                    filter_method = partial(self._refineFilterEx,
+                                            fuzzyEngine.initPattern(self._cli.pattern[0]),
+                                            fuzzyEngine.initPattern(self._cli.pattern[1]))
+                else:
+                    filter_method = partial(self._refineFilter, getWeight_0, getWeight_1)
                 highlight_method = partial(self._highlightRefine, getHighlights_0, getHighlights_1)
         else:
-            if self._fuzzy_engine and isAscii(self._cli.pattern) and self._getUnit() == 1: # currently, only BufTag's _getUnit() is 2
+            if self._fuzzy_engine and isAscii(self._cli.pattern):
                 use_fuzzy_engine = True
                 pattern = fuzzyEngine.initPattern(self._cli.pattern)
                 if self._getExplorer().getStlCategory() == "File" and self._cli.isFullPath:
@@ -766,18 +994,22 @@ class Manager(object):
             else:
                 fuzzy_match = FuzzyMatch(self._cli.pattern, encoding)
                 if self._getExplorer().getStlCategory() == "File" and self._cli.isFullPath:
-                    filter_method = partial(self._fuzzyFilter,
-                                            self._cli.isFullPath,
-                                            fuzzy_match.getWeight2)
+                    weight_method = "getWeight2"
                 elif self._getExplorer().getStlCategory() in ["Self", "Buffer", "Mru", "BufTag",
                         "Function", "History", "Cmd_History", "Search_History", "Rg"]:
-                    filter_method = partial(self._fuzzyFilter,
+                    weight_method = "getWeight3"
+                else:
+                    weight_method = "getWeight"
+
+                if fuzzyPool.isEnabled():
+                    use_fuzzy_pool = True
+                    filter_method = partial(self._fuzzyFilterPool,
                                             self._cli.isFullPath,
-                                            fuzzy_match.getWeight3)
+                                            weight_method)
                 else:
                     filter_method = partial(self._fuzzyFilter,
                                             self._cli.isFullPath,
-                                            fuzzy_match.getWeight)
+                                            getattr(fuzzy_match, weight_method))
 
                 highlight_method = partial(self._highlight,
                                            self._cli.isFullPath,
@@ -785,47 +1017,66 @@ class Manager(object):
 
         if self._cli.isAndMode:
             if self._fuzzy_engine and isAscii(''.join(self._cli.pattern)):
-                step = 20000 * cpu_count
+                step = 20000 * getFuzzyEngineThreads()
             else:
                 step = 10000
-            pair, highlight_methods = self._filter(step, filter_method, content, is_continue)
+            with tracer.span("Manager._filter") as args:
+                pair, highlight_methods = self._filter(step, filter_method, content, is_continue)
+                args["results"] = len(pair[0])
 
-            pairs = sorted(zip(*pair), key=operator.itemgetter(0), reverse=True)
-            self._result_content = self._getList(pairs)
+            with tracer.span("sort", results=len(pair[0])):
+                pairs = sorted(zip(*pair), key=sort_key, reverse=True)
+                self._result_content = self._getList(pairs)
         elif use_fuzzy_engine:
             if step == 0:
                 if return_index == True:
-                    step = 20000 * cpu_count
+                    step = 20000 * getFuzzyEngineThreads()
                 else:
-                    step = 40000 * cpu_count
-
-            pair = self._filter(step, filter_method, content, is_continue, True, return_index)
-            if is_continue: # result is not sorted
-                pairs = sorted(zip(*pair), key=operator.itemgetter(0), reverse=True)
-                self._result_content = self._getList(pairs)
-            else:
-                self._result_content = pair[1]
+                    step = 40000 * getFuzzyEngineThreads()
+
+            with tracer.span("Manager._filter", engine=True) as args:
+                pair = self._filter(step, filter_method, content, is_continue, True, return_index)
+                args["results"] = len(pair[0])
+
+            with tracer.span("sort", results=len(pair[0])):
+                if is_continue or boosts: # result is not sorted, or is to be sorted with boosts
+                    pairs = sorted(zip(*pair), key=sort_key, reverse=True)
+                    self._result_content = self._getList(pairs)
+                elif self._getUnit() > 1:
+                    self._result_content = self._getList(zip(*pair))
+                else:
+                    self._result_content = pair[1]
         else:
             if step == 0:
-                if use_fuzzy_match_c:
+                if use_refine_engine:
+                    step = 20000 * getFuzzyEngineThreads()
+                elif use_fuzzy_pool:
+                    step = 6000 * fuzzyPool.getProcessCount()
+                elif use_fuzzy_match_c:
                     step = 40000
                 elif self._getExplorer().supportsNameOnly() and self._cli.isFullPath:
                     step = 6000
                 else:
                     step = 12000
 
-            pairs = self._filter(step, filter_method, content, is_continue)
-            pairs.sort(key=operator.itemgetter(0), reverse=True)
-            self._result_content = self._getList(pairs)
+            with tracer.span("Manager._filter") as args:
+                pairs = self._filter(step, filter_method, content, is_continue)
+                args["results"] = len(pairs)
 
-        self._getInstance().setBuffer(self._result_content[:self._initial_count])
+            with tracer.span("sort", results=len(pairs)):
+                pairs.sort(key=sort_key, reverse=True)
+                self._result_content = self._getList(pairs)
+
+        with tracer.span("LfInstance.setBuffer", lines=min(len(self._result_content), self._initial_count)):
+            self._getInstance().setBuffer(self._result_content[:self._initial_count])
         self._getInstance().setStlResultsCount(len(self._result_content))
 
         if self._cli.isAndMode:
             self._highlight_method = partial(self._highlight_and_mode, highlight_methods)
-            self._highlight_method()
         else:
             self._highlight_method = highlight_method
+
+        with tracer.span("Manager._highlight"):
             self._highlight_method()
 
     def _highlight_and_mode(self, highlight_methods):
@@ -877,14 +1128,13 @@ class Manager(object):
 
     def _highlight(self, is_full_path, get_highlights, use_fuzzy_engine=False, clear=True, hl_group='Lf_hl_match'):
         # matchaddpos() is introduced by Patch 7.4.330
-        if (lfEval("exists('*matchaddpos')") == '0' or
-                lfEval("g:Lf_HighlightIndividual") == '0'):
+        if not (lfConfig.has_matchaddpos and lfConfig.highlight_individual):
             return
         cb = self._getInstance().buffer
         if self._getInstance().empty(): # buffer is empty.
             return
 
-        highlight_number = int(lfEval("g:Lf_NumberOfHighlight"))
+        highlight_number = lfConfig.number_of_highlight
         if clear:
             self._clearHighlights()
 
@@ -928,14 +1178,13 @@ class Manager(object):
 
     def _highlightRefine(self, first_get_highlights, get_highlights):
         # matchaddpos() is introduced by Patch 7.4.330
-        if (lfEval("exists('*matchaddpos')") == '0' or
-                lfEval("g:Lf_HighlightIndividual") == '0'):
+        if not (lfConfig.has_matchaddpos and lfConfig.highlight_individual):
             return
         cb = self._getInstance().buffer
         if self._getInstance().empty(): # buffer is empty.
             return
 
-        highlight_number = int(lfEval("g:Lf_NumberOfHighlight"))
+        highlight_number = lfConfig.number_of_highlight
         self._clearHighlights()
 
         getDigest = self._getDigest
@@ -983,35 +1232,157 @@ class Manager(object):
                 id = int(lfEval("matchaddpos('Lf_hl_matchRefine', %s)" % str(pos[j:j+8])))
                 self._highlight_ids.append(id)
 
-    def _regexFilter(self, iterable):
-        def noErrMatch(text, pattern):
-            try:
-                return '-1' != lfEval("g:LfNoErrMsgMatch('%s', '%s')" % (text, pattern))
-            except TypeError:   # python 2
-                return '-1' != lfEval("g:LfNoErrMsgMatch('%s', '%s')" % (text.replace('\x00', '\x01'), pattern))
-            except ValueError:  # python 3
-                return '-1' != lfEval("g:LfNoErrMsgMatch('%s', '%s')" % (text.replace('\x00', '\x01'), pattern))
+    def _getRegex(self):
+        """
+        return the python regex object equivalent to the vim regex pattern,
+        None if the pattern can not be translated
+        """
+        key = (self._cli.pattern, lfConfig.ignorecase)
+        if self._regex is None or self._regex[0] != key:
+            regex = lfTranslateRegex(self._cli.pattern)
+            if regex is not None:
+                python_regex, ignorecase = regex
+                if ignorecase is None:
+                    ignorecase = key[1]
+                try:
+                    regex = re.compile(python_regex, re.I if ignorecase else 0)
+                except re.error:
+                    regex = None
+            self._regex = (key, regex)
 
+        return self._regex[1]
+
+    def _regexMatch(self, texts):
+        """
+        return the indices of the items of `texts` that match the regex pattern
+        """
+        regex = self._getRegex()
+        if regex is not None:
+            search = regex.search
+            return [i for i, text in enumerate(texts) if search(text)]
+
+        # the pattern can not be translated, let vim match all the texts in one call
         try:
             if ('-2' == lfEval("g:LfNoErrMsgMatch('', '%s')" % escQuote(self._cli.pattern))):
-                return iter([])
-            else:
-                return (line for line in iterable
-                        if noErrMatch(escQuote(self._getDigest(line, 0).strip()), escQuote(self._cli.pattern)))
+                return []
+
+            try:
+                vim.vars["Lf_regex_texts"] = texts
+            except (TypeError, ValueError): # texts contain '\x00'
+                vim.vars["Lf_regex_texts"] = [text.replace('\x00', '\x01') for text in texts]
+
+            indices = lfEval("filter(range(len(g:Lf_regex_texts)), "
+                             "'match(g:Lf_regex_texts[v:val], ''%s'') != -1')"
+                             % escQuote(escQuote(self._cli.pattern)))
+            lfCmd("unlet g:Lf_regex_texts")
+            return [int(i) for i in indices]
         except vim.error:
-            return iter([])
+            return []
+
+    def _regexFilter(self, iterable, mode=0):
+        """
+        return a list of the lines in `iterable` whose digest matches the regex pattern
+        Args:
+            mode: the mode passed to _getDigest()
+        """
+        unit = self._getUnit()
+        texts = [digest.strip() for digest in self._getDigests(iterable[::unit], mode)]
+        indices = self._regexMatch(texts)
+        if unit > 1:
+            units = self._getUnits(iterable)
+            return list(itertools.chain.from_iterable(units[i] for i in indices))
+        else:
+            return [iterable[i] for i in indices]
 
     def _regexSearch(self, content, is_continue, step):
         if not self._cli.isPrefix:
             self._index = 0
-        self._result_content = self._filter(8000, self._regexFilter, content, is_continue)
-        self._getInstance().setBuffer(self._result_content[:self._initial_count])
+        with tracer.span("Manager._filter") as args:
+            self._result_content = self._filter(40000, self._regexFilter, content, is_continue)
+            args["results"] = len(self._result_content)
+
+        with tracer.span("LfInstance.setBuffer", lines=min(len(self._result_content), self._initial_count)):
+            self._getInstance().setBuffer(self._result_content[:self._initial_count])
         self._getInstance().setStlResultsCount(len(self._result_content))
 
+    def _lineToIndex(self, line_nr):
+        """
+        return the index of the result on line `line_nr`,
+        the index is not in range(self._getResultsCount()) if it is a line of help
+        """
+        if self._getInstance().isReverseOrder():
+            return len(self._getInstance().buffer) - self._help_length - line_nr
+        else:
+            return line_nr - self._help_length - 1
+
+    def _getResults(self):
+        """
+        return the list of the results, the selections are indices into it,
+        the buffer may only hold the first of them
+        """
+        if self._cli.pattern:
+            return self._result_content
+        else:
+            return self._content
+
+    def _getResultsCount(self):
+        return len(self._getResults())
+
+    def _renderSelections(self):
+        """
+        highlight the selected lines with one matchadd(), only the lines of the
+        visible window, and of one window's height above and below it, are
+        highlighted, see updateSelections()
+        """
+        if self._selection_match_id is not None:
+            lfCmd("silent! call matchdelete(%d)" % self._selection_match_id)
+            self._selection_match_id = None
+        self._selection_range = None
+
+        if not self._selections:
+            return
+
+        top, bottom = [int(i) for i in lfEval("[line('w0'), line('w$')]")]
+        buffer_len = len(self._getInstance().buffer)
+        start = max(top - (bottom - top + 1), 1)
+        end = min(bottom + (bottom - top + 1), buffer_len)
+        self._selection_range = (start, end, buffer_len)
+
+        runs = []
+        for line_nr in range(start, end + 1):
+            if self._lineToIndex(line_nr) in self._selections:
+                if runs and runs[-1][1] == line_nr - 1:
+                    runs[-1][1] = line_nr
+                else:
+                    runs.append([line_nr, line_nr])
+
+        if not runs:
+            return
+
+        pattern = r'\|'.join(r'\%%%dl.' % first if first == last
+                              else r'\%%>%dl\%%<%dl.' % (first - 1, last + 1)
+                              for first, last in runs)
+        self._selection_match_id = int(lfEval("matchadd('Lf_hl_selection', '%s')" % pattern))
+
+    def updateSelections(self):
+        """
+        highlight the selections again if the window is scrolled out of the
+        highlighted lines or the buffer has changed
+        """
+        if not self._selections:
+            return
+
+        if self._selection_range is not None:
+            start, end, buffer_len = self._selection_range
+            top, bottom = [int(i) for i in lfEval("[line('w0'), line('w$')]")]
+            if start <= top and bottom <= end and buffer_len == len(self._getInstance().buffer):
+                return
+
+        self._renderSelections()
+
     def clearSelections(self):
-        for i in self._selections.values():
-            lfCmd("call matchdelete(%d)" % i)
         self._selections.clear()
+        self._renderSelections()
 
     def _cleanup(self):
         if lfEval("g:Lf_RememberLastSearch") == '0':
@@ -1080,9 +1451,8 @@ class Manager(object):
 
         cwd = os.getcwd()
         if len(self._selections) > 0:
-            files = []
-            for i in sorted(self._selections.keys()):
-                files.append(self._getInstance().buffer[i-1])
+            results = self._getResults()
+            files = [results[i] for i in sorted(self._selections) if i < len(results)]
             if "--stayOpen" in self._arguments:
                 try:
                     vim.current.tabpage, vim.current.window, vim.current.buffer = self._getInstance().getOriginalPos()
@@ -1163,6 +1533,7 @@ class Manager(object):
         self._clearHighlights()
         self._clearHighlightsPos()
         self.clearSelections()
+        self._digest_cache = {}
 
         self._content = self._getInstance().initBuffer(content, self._getUnit(), self._getExplorer().setContent)
         self._iteration_end = True
@@ -1189,12 +1560,15 @@ class Manager(object):
             lfCmd("norm! j")
             return
 
-        if line_nr in self._selections:
-            lfCmd("call matchdelete(%d)" % self._selections[line_nr])
-            del self._selections[line_nr]
+        index = self._lineToIndex(line_nr)
+        if not 0 <= index < self._getResultsCount():
+            return
+
+        if index in self._selections:
+            self._selections.remove(index)
         else:
-            id = int(lfEval("matchadd('Lf_hl_selection', '\%%%dl.')" % line_nr))
-            self._selections[line_nr] = id
+            self._selections.add(index)
+        self._renderSelections()
 
     def selectMulti(self):
         orig_line = self._getInstance().window.cursor[0]
@@ -1204,25 +1578,23 @@ class Manager(object):
             return
         elif nr == int(lfEval("v:mouse_win")):
             cur_line = int(lfEval("v:mouse_lnum"))
-        self.clearSelections()
+        count = self._getResultsCount()
+        self._selections.clear()
         for i in range(min(orig_line, cur_line), max(orig_line, cur_line)+1):
-            if i > self._help_length and i not in self._selections:
-                id = int(lfEval("matchadd('Lf_hl_selection', '\%%%dl.')" % (i)))
-                self._selections[i] = id
+            index = self._lineToIndex(i)
+            if 0 <= index < count:
+                self._selections.add(index)
+        self._renderSelections()
 
     def selectAll(self):
-        line_num = len(self._getInstance().buffer)
-        if line_num > 300:
-            lfCmd("echohl Error | redraw | echo ' Too many files selected!' | echohl NONE")
-            lfCmd("sleep 1")
-            return
-        for i in range(line_num):
-            if i >= self._help_length and i+1 not in self._selections:
-                id = int(lfEval("matchadd('Lf_hl_selection', '\%%%dl.')" % (i+1)))
-                self._selections[i+1] = id
+        self._selections = set(range(self._getResultsCount()))
+        self._renderSelections()
 
     def startExplorer(self, win_pos, *args, **kwargs):
+        lfConfig.refresh()
         self.setArguments(kwargs.get("arguments", {}))
+        self._digest_cache = {}
+        self._frecency_boosts = None
         self._cli.setNameOnlyFeature(self._getExplorer().supportsNameOnly())
         self._cli.setRefineFeature(self._supportsRefine())
 
@@ -1291,7 +1663,7 @@ class Manager(object):
             self._is_content_list = False
             self._result_content = []
             self._callback = self._workInIdle
-            if lfEval("g:Lf_CursorBlink") == '0':
+            if not lfConfig.cursor_blink:
                 self._content = self._getInstance().initBuffer(content, self._getUnit(), self._getExplorer().setContent)
             else:
                 if self._getExplorer().getStlCategory() in ["Rg"]:
@@ -1326,7 +1698,7 @@ class Manager(object):
             self._is_content_list = False
             self._result_content = []
             self._callback = partial(self._workInIdle, content)
-            if lfEval("g:Lf_CursorBlink") == '0':
+            if not lfConfig.cursor_blink:
                 self._content = self._getInstance().initBuffer(content, self._getUnit(), self._getExplorer().setContent)
             else:
                 self._content = []
@@ -1359,6 +1731,10 @@ class Manager(object):
             self._getInstance().setBuffer(self._result_content)
         elif self._index == 0:
             self._getInstance().setBuffer(self._content)
+        else:
+            return
+        # in reverse order, the lines already shown are moved down
+        self.updateSelections()
 
     def _workInIdle(self, content=None, bang=False):
         if self._read_content_exception is not None:
@@ -1375,9 +1751,11 @@ class Manager(object):
         if self._is_content_list:
             if self._cli.pattern and (self._index < len(self._content) or len(self._cb_content) > 0):
                 if self._fuzzy_engine:
-                    step = 10000 * cpu_count
+                    step = 10000 * getFuzzyEngineThreads()
                 elif is_fuzzyMatch_C:
                     step = 10000
+                elif fuzzyPool.isEnabled():
+                    step = 2000 * fuzzyPool.getProcessCount()
                 else:
                     step = 2000
                 self._search(self._content, True, step)
@@ -1425,9 +1803,11 @@ class Manager(object):
 
             if self._cli.pattern and (self._index < len(self._content) or len(self._cb_content) > 0):
                 if self._fuzzy_engine:
-                    step = 10000 * cpu_count
+                    step = 10000 * getFuzzyEngineThreads()
                 elif is_fuzzyMatch_C:
                     step = 10000
+                elif fuzzyPool.isEnabled():
+                    step = 2000 * fuzzyPool.getProcessCount()
                 else:
                     step = 2000
                 self._search(self._content, True, step)
@@ -1450,9 +1830,11 @@ class Manager(object):
             if self._cli.pattern:
                 if self._index < cur_len or len(self._cb_content) > 0:
                     if self._fuzzy_engine:
-                        step = 10000 * cpu_count
+                        step = 10000 * getFuzzyEngineThreads()
                     elif is_fuzzyMatch_C:
                         step = 10000
+                    elif fuzzyPool.isEnabled():
+                        step = 2000 * fuzzyPool.getProcessCount()
                     else:
                         step = 2000
                     self._search(self._content[:cur_len], True, step)
@@ -1486,6 +1868,7 @@ class Manager(object):
             self._search(self._content)
 
         for cmd in self._cli.input(self._callback):
+            tracer.mark("LfCli.input", key=cmd, pattern=str(self._cli.pattern))
             cur_len = len(self._content)
             cur_content = self._content[:cur_len]
             if equal(cmd, '<Update>'):
@@ -1560,7 +1943,7 @@ class Manager(object):
                 self._resetHighlights()
                 if self._getInstance().isReverseOrder() and self._cli.pattern \
                         and len(self._highlight_pos) < (len(self._getInstance().buffer) - self._help_length) // self._getUnit() \
-                        and len(self._highlight_pos) < int(lfEval("g:Lf_NumberOfHighlight")):
+                        and len(self._highlight_pos) < lfConfig.number_of_highlight:
                     self._highlight_method()
                 break
             elif equal(cmd, '<F5>'):
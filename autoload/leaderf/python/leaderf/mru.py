@@ -4,34 +4,275 @@
 import vim
 import os
 import sys
+import time
 import os.path
 import fnmatch
+import itertools
+from collections import OrderedDict
 from .utils import *
 
+if os.name == 'nt':
+    import msvcrt
+
+    def lockFile(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def unlockFile(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def lockFile(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def unlockFile(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+if sys.version_info >= (3, 0):
+    def toBytes(str):
+        return str.encode('utf-8', 'surrogateescape')
+
+    def fromBytes(bytes):
+        return bytes.decode('utf-8', 'surrogateescape')
+else:
+    def toBytes(str):
+        return str
+
+    def fromBytes(bytes):
+        return bytes
+
+
+#*****************************************************
+# Frecency
+#*****************************************************
+class Frecency(object):
+    """
+    Record how frequently and how recently the files are opened.
+    Each line of the cache file is "{score}\t{time}\t{file name}", the score of
+    a file is the sum of the scores of its lines, and halves every HALF_LIFE
+    seconds. Opening a file appends a line with score 1, the cache file is
+    compacted when it has much more lines than files.
+    """
+    HALF_LIFE = 7 * 24 * 3600.0
+
+    def __init__(self, cache_dir):
+        self._cache_file = os.path.join(cache_dir, 'frecency')
+        self._scores = {}   # a dict with (key, value) = (file name, (score, time))
+        self._lines = 0
+        self._stat = None
+
+    def _decay(self, score, start, end):
+        return score * 0.5 ** ((end - start) / self.HALF_LIFE)
+
+    def _merge(self, name, score, t):
+        if name in self._scores:
+            old_score, old_t = self._scores[name]
+            if old_t > t:
+                score, t, old_score, old_t = old_score, old_t, score, t
+            score += self._decay(old_score, old_t, t)
+        self._scores[name] = (score, t)
+
+    def _sync(self, f):
+        """
+        `f` is the cache file opened in binary mode and locked
+        """
+        st = os.fstat(f.fileno())
+        if (st.st_mtime, st.st_size) == self._stat:
+            return
+
+        self._scores = {}
+        self._lines = 0
+        f.seek(0)
+        for line in f:
+            if line[-1:] != b'\n':
+                break
+            try:
+                score, t, name = fromBytes(line.rstrip(b'\r\n')).split('\t', 2)
+                self._merge(name, float(score), float(t))
+                self._lines += 1
+            except ValueError:
+                pass
+        self._stat = (st.st_mtime, st.st_size)
+
+    def _compact(self, f, now):
+        scores = []
+        for name, (score, t) in self._scores.items():
+            score = self._decay(score, t, now)
+            if score >= 0.01:
+                scores.append((name, score))
+
+        f.seek(0)
+        f.truncate(0)
+        f.write(b''.join(toBytes("%.6g\t%d\t%s\n" % (score, now, name)) for name, score in scores))
+        self._scores = {name: (score, now) for name, score in scores}
+        self._lines = len(scores)
+
+    def record(self, names):
+        """
+        record that the files in `names` are opened
+        """
+        now = int(time.time())
+        with open(self._cache_file, 'ab+') as f:
+            lockFile(f)
+            try:
+                self._sync(f)
+                f.seek(0, os.SEEK_END)
+                f.write(b''.join(toBytes("1\t%d\t%s\n" % (now, name)) for name in names))
+                for name in names:
+                    self._merge(name, 1.0, now)
+                self._lines += len(names)
+                if self._lines > len(self._scores) * 2 + 100:
+                    self._compact(f, now)
+                f.flush()
+                st = os.fstat(f.fileno())
+                self._stat = (st.st_mtime, st.st_size)
+            finally:
+                unlockFile(f)
+
+    def getBoosts(self, to_line):
+        """
+        return a dict with (key, value) = (line, boost), the boost is between
+        0 and g:Lf_FrecencyWeight, and is to be added to the weight of the line
+        Args:
+            to_line: a function that returns the line of a file name in the
+                     content, or None if the file is not in the content
+        """
+        weight = float(lfEval("g:Lf_FrecencyWeight"))
+        if weight <= 0:
+            return {}
+
+        with open(self._cache_file, 'ab+') as f:
+            lockFile(f)
+            try:
+                self._sync(f)
+            finally:
+                unlockFile(f)
+
+        now = time.time()
+        boosts = {}
+        for name, (score, t) in self._scores.items():
+            line = to_line(name)
+            if line is not None:
+                score = self._decay(score, t, now)
+                boosts[line] = weight * score / (score + 1)
+        return boosts
+
 
 #*****************************************************
 # Mru
 #*****************************************************
 class Mru(object):
+    """
+    The most recently used files are recorded in a journal, each line of which
+    is either "+{file name}" or "-{file name}", the newer the lower.
+    The journal is only appended to, and is compacted when it has more than
+    twice g:Lf_MruMaxFiles lines.
+    """
     def __init__(self):
         self._cache_dir = os.path.join(lfEval("g:Lf_CacheDirectory"),
                                        '.LfCache',
                                        'python' + lfEval("g:Lf_PythonVersion"),
                                        'mru')
-        self._cache_file = os.path.join(self._cache_dir, 'mruCache')
+        self._cache_file = os.path.join(self._cache_dir, 'mruCache')  # the old format
+        self._journal_file = os.path.join(self._cache_dir, 'mruJournal')
+        self._index = OrderedDict()     # (key, value) = (file name to compare, file name), oldest first
+        self._journal_id = None         # the first line of the journal, changed by compaction
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._nocase = sys.platform[:3] == 'win' or sys.platform in ('cygwin', 'msys')
         self._initCache()
+        self._frecency = Frecency(self._cache_dir)
         self._mru_bufnrs = { b.number: 0 for b in vim.buffers }
         self._timestamp = 0
 
     def _initCache(self):
         if not os.path.exists(self._cache_dir):
             os.makedirs(self._cache_dir)
-        if not os.path.exists(self._cache_file):
-            with lfOpen(self._cache_file, 'w', errors='ignore'):
-                pass
+        if not os.path.exists(self._journal_file):
+            names = []
+            if os.path.exists(self._cache_file):
+                with lfOpen(self._cache_file, 'r', errors='ignore') as f:
+                    names = [line.rstrip() for line in reversed(f.readlines()) if line.strip()]
+            with open(self._journal_file, 'ab+') as f:
+                lockFile(f)
+                try:
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() == 0:
+                        self._compact(f, names)
+                finally:
+                    unlockFile(f)
+
+    def _key(self, name):
+        return name.lower() if self._nocase else name
 
-    def getCacheFileName(self):
-        return self._cache_file
+    def _apply(self, record):
+        name = record[1:]
+        key = self._key(name)
+        self._index.pop(key, None)
+        if record[0] == '+':
+            self._index[key] = name
+
+    def _sync(self, f):
+        """
+        read the records appended by this or other Vim instances since last time,
+        `f` is the journal opened in binary mode and locked
+        """
+        f.seek(0)
+        journal_id = f.readline()
+        if journal_id != self._journal_id:
+            self._index.clear()
+            self._journal_id = journal_id
+            self._journal_offset = f.tell()
+            self._journal_lines = 0
+        else:
+            f.seek(self._journal_offset)
+
+        for line in f:
+            if line[-1:] != b'\n':  # an incomplete line written by a crashed Vim
+                break
+            self._journal_offset += len(line)
+            self._journal_lines += 1
+            record = fromBytes(line.rstrip(b'\r\n'))
+            if len(record) > 1:
+                self._apply(record)
+
+    def _compact(self, f, names):
+        """
+        rewrite the journal with `names`, which is ordered from old to new
+        """
+        f.seek(0)
+        f.truncate(0)
+        self._journal_id = toBytes("#%r\n" % time.time())
+        records = [self._journal_id] + [toBytes('+' + name + '\n') for name in names]
+        f.write(b''.join(records))
+        f.flush()
+        self._journal_offset = f.tell()
+        self._journal_lines = len(names)
+        self._index.clear()
+        for name in names:
+            self._index[self._key(name)] = name
+
+    def _append(self, records):
+        max_files = int(lfEval("g:Lf_MruMaxFiles"))
+        with open(self._journal_file, 'ab+') as f:
+            lockFile(f)
+            try:
+                self._sync(f)
+                if records:
+                    f.seek(0, os.SEEK_END)
+                    f.write(b''.join(toBytes(r + '\n') for r in records))
+                    f.flush()
+                    self._journal_offset = f.tell()
+                    self._journal_lines += len(records)
+                    for r in records:
+                        self._apply(r)
+
+                if self._journal_lines > max_files * 2:
+                    self._compact(f, list(self._index.values())[-max_files:])
+            finally:
+                unlockFile(f)
 
     def normalize(self, name):
         if '~' in name:
@@ -48,39 +289,41 @@ class Mru(object):
         return name
 
     def saveToCache(self, buf_name_list):
+        """
+        Args:
+            buf_name_list: a list of file names, the most recently used first
+        """
+        exclude = lfEval("g:Lf_MruFileExclude")
         buf_names = []
         for name in buf_name_list:
             name = self.normalize(name)
-            if True in (fnmatch.fnmatch(name, i)
-                        for i in lfEval("g:Lf_MruFileExclude")):
+            if True in (fnmatch.fnmatch(name, i) for i in exclude):
                 continue
             buf_names.append(name)
 
-        if not buf_names:
-            return
+        self._append(['+' + name for name in reversed(buf_names)])
+        if buf_names:
+            self._frecency.record(buf_names)
+
+    def flush(self):
+        """
+        save the files recorded by lfMru#record() to the cache
+        """
+        self.saveToCache(lfEval("readfile(lfMru#CacheFileName())"))
+        lfCmd("call writefile([], lfMru#CacheFileName())")
+
+    def getFrecencyBoosts(self, to_line):
+        return self._frecency.getBoosts(to_line)
+
+    def delFromCache(self, names):
+        self._append(['-' + name for name in names])
 
-        with lfOpen(self._cache_file, 'r+', errors='ignore') as f:
-            lines = f.readlines()
-            for name in buf_names:
-                nocase = False
-                compare = name
-                if sys.platform[:3] == 'win' or sys.platform in ('cygwin', 'msys'):
-                    nocase = True
-                    compare = name.lower()
-
-                for i, line in enumerate(lines):
-                    text = line.rstrip()
-                    if (compare == text) or (nocase and compare == text.lower()):
-                        del lines[i]
-                        break
-
-            lines = [name + '\n' for name in buf_names] + lines
-            max_files = int(lfEval("g:Lf_MruMaxFiles"))
-            if len(lines) > max_files:
-                del lines[max_files:]
-            f.seek(0)
-            f.truncate(0)
-            f.writelines(lines)
+    def getFiles(self):
+        """
+        return the most recently used files, the most recently used first
+        """
+        max_files = int(lfEval("g:Lf_MruMaxFiles"))
+        return [self._index[key] for key in itertools.islice(reversed(self._index), max_files)]
 
     def setBufferTimestamp(self, buf_number):
         self._mru_bufnrs[buf_number] = self._timestamp
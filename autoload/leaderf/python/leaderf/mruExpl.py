@@ -3,13 +3,158 @@
 
 import vim
 import os
+import sys
+import time
 import os.path
+import threading
 from fnmatch import fnmatch
 from .utils import *
 from .explorer import *
 from .manager import *
 from .mru import *
 
+if sys.version_info >= (3, 0):
+    import queue as Queue
+else:
+    import Queue
+
+
+#*****************************************************
+# PathValidator
+#*****************************************************
+class PathValidator(object):
+    """
+    Check whether the files exist on a pool of threads, so that a slow
+    file system, e.g., NFS or sshfs, does not block the picker.
+    Only one check is in flight on a mount point until one of them returns
+    within `timeout` seconds. If a check on a mount point takes longer, the
+    remaining files on it are assumed to exist.
+    """
+    def __init__(self, thread_num=8, timeout=0.5, missing_ttl=60):
+        self._thread_num = thread_num
+        self._timeout = timeout
+        self._missing_ttl = missing_ttl
+        self._threads = []
+        self._queue = Queue.Queue()
+        self._vanished = Queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._running = {}      # a dict with (key, value) = (thread id, (mount point, start time))
+        self._slow_mounts = {}  # a dict with (key, value) = (mount point, time)
+        self._fast_mounts = set()   # the mount points that a check returned in time in this generation
+        self._pending = {}      # a dict with (key, value) = (mount point, [(generation, name, path), ...])
+        self._missing = {}      # a dict with (key, value) = (file name, time)
+
+    def _getMount(self, path):
+        """
+        the mount point is approximated by the first two components of the path
+        """
+        drive, path = os.path.splitdrive(path)
+        if drive:
+            return drive
+        return os.sep.join(path.split(os.sep)[:3])
+
+    def _isSlow(self, mount, now):
+        if now - self._slow_mounts.get(mount, -self._missing_ttl) < self._missing_ttl:
+            return True
+        for m, start in self._running.values():
+            if m == mount and now - start > self._timeout:
+                self._slow_mounts[mount] = now
+                return True
+        return False
+
+    def _isBusy(self, mount):
+        """
+        return True if a check is in flight on `mount`, which is not known to be fast
+        """
+        if mount in self._fast_mounts:
+            return False
+        for m, _ in self._running.values():
+            if m == mount:
+                return True
+        return False
+
+    def _workerThread(self):
+        thread_id = threading.current_thread().ident
+        while True:
+            item = self._queue.get()
+            generation, name, path = item
+            mount = self._getMount(path)
+            start = time.time()
+            with self._lock:
+                if generation != self._generation or self._isSlow(mount, start):
+                    continue
+                if self._isBusy(mount):
+                    # wait until the check in flight on the mount returns
+                    self._pending.setdefault(mount, []).append(item)
+                    continue
+                self._running[thread_id] = (mount, start)
+
+            exists = os.path.exists(path)
+
+            now = time.time()
+            with self._lock:
+                del self._running[thread_id]
+                if now - start > self._timeout:
+                    self._slow_mounts[mount] = now
+                    self._pending.pop(mount, None)
+                else:
+                    if generation == self._generation:
+                        self._fast_mounts.add(mount)
+                    for i in self._pending.pop(mount, []):
+                        self._queue.put(i)
+                if not exists:
+                    self._missing[name] = now
+                    if generation == self._generation:
+                        self._vanished.put(name)
+
+    def validate(self, names):
+        """
+        check the files in the background, the result of the previous call
+        is discarded
+        """
+        now = time.time()
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._fast_mounts.clear()
+            self._pending.clear()
+            self._missing = dict((name, t) for name, t in self._missing.items()
+                                 if now - t < self._missing_ttl)
+            # the threads blocked by a slow mount point do not count
+            stuck = set(thread_id for thread_id, (_, start) in self._running.items()
+                        if now - start > self._timeout)
+        while not self._vanished.empty():
+            self._vanished.get()
+
+        for name in names:
+            self._queue.put((generation, name, lfDecode(name)))
+
+        self._threads = [t for t in self._threads if t.is_alive()]
+        count = len([t for t in self._threads if t.ident not in stuck])
+        while count < self._thread_num:
+            t = threading.Thread(target=self._workerThread)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+            count += 1
+
+    def isMissing(self, name):
+        """
+        return True if `name` was found missing recently
+        """
+        with self._lock:
+            return time.time() - self._missing.get(name, -self._missing_ttl) < self._missing_ttl
+
+    def getVanished(self):
+        """
+        return the files found missing since last call
+        """
+        vanished = []
+        while not self._vanished.empty():
+            vanished.append(self._vanished.get())
+        return vanished
+
 
 #*****************************************************
 # MruExplorer
@@ -18,26 +163,25 @@ class MruExplorer(Explorer):
     def __init__(self):
         self._prefix_length = 0
         self._max_bufname_len = 0
+        self._validator = PathValidator()
+        self._lines = {}    # a dict with (key, value) = (file name, line in the content)
 
     def getContent(self, *args, **kwargs):
-        mru.saveToCache(lfEval("readfile(lfMru#CacheFileName())"))
-        lfCmd("call writefile([], lfMru#CacheFileName())")
+        mru.flush()
 
-        with lfOpen(mru.getCacheFileName(), 'r+', errors='ignore') as f:
-            lines = f.readlines()
-            lines = [name for name in lines if os.path.exists(lfDecode(name.rstrip()))]
-            f.seek(0)
-            f.truncate(0)
-            f.writelines(lines)
+        # the files that do not exist are removed later by MruExplManager
+        lines = [name for name in mru.getFiles() if not self._validator.isMissing(name)]
 
         if "--cwd" in kwargs.get("arguments", {}):
             lines = [name for name in lines if lfDecode(name).startswith(os.getcwd())]
 
-        lines = [line.rstrip() for line in lines] # remove the '\n'
         wildignore = lfEval("g:Lf_MruWildIgnore")
         lines = [name for name in lines if True not in (fnmatch(name, j) for j in wildignore['file'])
                     and True not in (fnmatch(name, "*/" + j + "/*") for j in wildignore['dir'])]
 
+        self._validator.validate(lines)
+        self._lines = {}
+
         if len(lines) == 0:
             return lines
 
@@ -45,20 +189,22 @@ class MruExplorer(Explorer):
             lines = lines[1:] + lines[0:1]
 
         if "--no-split-path" in kwargs.get("arguments", {}):
+            self._lines = {name: name for name in lines}
             return lines
 
-        self._max_bufname_len = max(int(lfEval("strdisplaywidth('%s')"
-                                        % escQuote(getBasename(line))))
+        ambiwidth = lfAmbiwidth()
+        encoding = lfEval("&encoding")
+        self._max_bufname_len = max(lfDisplayWidth(getBasename(line), ambiwidth, encoding=encoding)
                                     for line in lines)
-        for i, line in enumerate(lines):
-            if lfEval("g:Lf_ShowRelativePath") == '1':
-                line = lfRelpath(line)
+        show_relative_path = lfEval("g:Lf_ShowRelativePath") == '1'
+        for i, name in enumerate(lines):
+            line = lfRelpath(name) if show_relative_path else name
             basename = getBasename(line)
             dirname = getDirname(line)
-            space_num = self._max_bufname_len \
-                        - int(lfEval("strdisplaywidth('%s')" % escQuote(basename)))
+            space_num = self._max_bufname_len - lfDisplayWidth(basename, ambiwidth, encoding=encoding)
             lines[i] = '{}{} "{}"'.format(getBasename(line), ' ' * space_num,
                                           dirname if dirname else '.' + os.sep)
+            self._lines[name] = lines[i]
         return lines
 
     def getStlCategory(self):
@@ -74,12 +220,19 @@ class MruExplorer(Explorer):
         return True
 
     def delFromCache(self, name):
-        with lfOpen(mru.getCacheFileName(), 'r+', errors='ignore') as f:
-            lines = f.readlines()
-            lines.remove(lfEncode(os.path.abspath(lfDecode(name))) + '\n')
-            f.seek(0)
-            f.truncate(0)
-            f.writelines(lines)
+        mru.delFromCache([lfEncode(os.path.abspath(lfDecode(name)))])
+
+    def getLines(self):
+        return self._lines
+
+    def getVanishedLines(self):
+        """
+        return the lines of the files that are found missing since last call
+        """
+        vanished = self._validator.getVanished()
+        if vanished:
+            mru.delFromCache(vanished)
+        return [self._lines[name] for name in vanished if name in self._lines]
 
     def getPrefixLength(self):
         return self._prefix_length
@@ -102,13 +255,33 @@ class MruExplManager(Manager):
     def _defineMaps(self):
         lfCmd("call leaderf#Mru#Maps()")
 
+    def _getFrecencyBoosts(self):
+        return mru.getFrecencyBoosts(self._getExplorer().getLines().get)
+
+    def _workInIdle(self, content=None, bang=False):
+        self._removeVanished()
+        super(MruExplManager, self)._workInIdle(content, bang)
+
+    def _removeVanished(self):
+        """
+        remove the files that do not exist from the result
+        """
+        vanished = set(self._getExplorer().getVanishedLines())
+        if not vanished:
+            return
+
+        self._content = [line for line in self._content if line not in vanished]
+        self._getInstance().setStlTotal(len(self._content))
+        if self._cli.pattern:
+            self._index = 0
+            self._search(self._content)
+        else:
+            self._getInstance().setBuffer(self._content[:self._initial_count])
+            self._getInstance().setStlResultsCount(len(self._content))
+
     def _argaddFiles(self, files):
-        # It will raise E480 without 'silent!'
-        lfCmd("silent! argdelete *")
-        for file in files:
-            dirname = self._getDigest(file, 2)
-            basename = self._getDigest(file, 1)
-            lfCmd("argadd %s" % escSpecial(dirname + basename))
+        super(MruExplManager, self)._argaddFiles([self._getDigest(file, 2) + self._getDigest(file, 1)
+                                                  for file in files])
 
     def _acceptSelection(self, *args, **kwargs):
         if len(args) == 0:
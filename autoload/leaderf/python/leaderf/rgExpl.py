@@ -8,6 +8,8 @@ import os.path
 import tempfile
 from functools import wraps
 from .utils import *
+from .rootResolver import *
+from .snippetReader import *
 from .explorer import *
 from .manager import *
 from .mru import *
@@ -377,6 +379,8 @@ class RgExplManager(Manager):
         self._match_ids = []
         self._match_path = False
         self._has_column = False
+        self._preview_buffer = None
+        self._preview_syntax = {}   # {extension: filetype}
 
     def _getExplClass(self):
         return RgExplorer
@@ -422,6 +426,9 @@ class RgExplManager(Manager):
         if "--recall" not in self._arguments:
             self._has_column = "--column" in lfEval("get(g:, 'Lf_RgConfig', [])")
 
+    def _cachesDigests(self):
+        return True
+
     def _getDigest(self, line, mode):
         """
         specify what part in the line to be processed and highlighted
@@ -503,15 +510,14 @@ class RgExplManager(Manager):
 
     def _afterEnter(self):
         super(RgExplManager, self)._afterEnter()
-        id = int(lfEval("matchadd('Lf_hl_rgFileName', '^.\{-}\ze[:-]\d', 10)"))
-        self._match_ids.append(id)
-        id = int(lfEval("matchadd('Lf_hl_rgLineNumber', '^.\{-}\zs:\d\+:', 10)"))
-        self._match_ids.append(id)
-        id = int(lfEval("matchadd('Lf_hl_rgLineNumber2', '^.\{-}\zs-\d\+-', 10)"))
-        self._match_ids.append(id)
+        matches = [
+                ('Lf_hl_rgFileName', r'^.\{-}\ze[:-]\d', 10),
+                ('Lf_hl_rgLineNumber', r'^.\{-}\zs:\d\+:', 10),
+                ('Lf_hl_rgLineNumber2', r'^.\{-}\zs-\d\+-', 10),
+                ]
         if self._has_column:
-            id = int(lfEval("matchadd('Lf_hl_rgColumnNumber', '^.\{-}:\d\+:\zs\d\+:', 10)"))
-            self._match_ids.append(id)
+            matches.append(('Lf_hl_rgColumnNumber', r'^.\{-}:\d\+:\zs\d\+:', 10))
+        self._match_ids.extend(self._addMatches(matches))
 
         try:
             for i in self._getExplorer().getPatternRegex():
@@ -528,6 +534,102 @@ class RgExplManager(Manager):
         if self._timer_id is not None:
             lfCmd("call timer_stop(%s)" % self._timer_id)
             self._timer_id = None
+        self._restoreOrigBuffer()
+
+    def _getPreviewBuffer(self):
+        """
+        return the scratch buffer that the results are previewed in,
+        it is created once and reused
+        """
+        if self._preview_buffer is None or not self._preview_buffer.valid:
+            buf_number = int(lfEval("bufnr('LeaderF://preview', 1)"))
+            self._preview_buffer = vim.buffers[buf_number]
+            lfCmd("hide buffer %d | setlocal buftype=nofile bufhidden=hide noswapfile nobuflisted"
+                  % buf_number)
+        return self._preview_buffer
+
+    def _getPreviewSyntax(self, file):
+        """
+        return the filetype of `file`, it is detected once per extension,
+        and FileType is ignored so that no ftplugin is loaded into the preview buffer
+        """
+        extension = os.path.splitext(file)[1] or os.path.basename(file)
+        if extension not in self._preview_syntax:
+            saved_eventignore = vim.options['eventignore']
+            vim.options['eventignore'] = 'FileType,Syntax'
+            try:
+                lfCmd("setlocal filetype= | silent! doautocmd filetypedetect BufRead %s"
+                      % escSpecial(file))
+                self._preview_syntax[extension] = lfEval("&filetype")
+            finally:
+                vim.options['eventignore'] = saved_eventignore
+
+        return self._preview_syntax[extension]
+
+    def _previewSnippet(self, line):
+        """
+        show the lines around the result `line` in the preview buffer,
+        only these lines are read instead of loading the whole file
+        """
+        m = re.match(r'^(.+?)[:-](\d+)[:-]', line)
+        if m is None:
+            return
+
+        file, line_num = m.group(1, 2)
+        line_num = int(line_num)
+        count = vim.current.window.height * 3
+
+        match = re.search(r'\d+_`No_Name_(\d+)`', file)
+        if match:
+            buffer = vim.buffers[int(match.group(1))]
+            start = max(min(line_num - count // 2, len(buffer) - count + 1), 1)
+            lines = buffer[start-1 : start-1+count]
+            syntax = lfEval("getbufvar(%d, '&syntax')" % buffer.number)
+        else:
+            if not os.path.isabs(file):
+                if file.startswith(".\\") or file.startswith("./"):
+                    file = file[2:]
+                file = os.path.join(self._getInstance().getCwd(), lfDecode(file))
+                file = lfEncode(file)
+            try:
+                start, lines = snippetReader.read(file, line_num, count)
+            except (IOError, OSError, ValueError) as e:
+                lfPrintError(e)
+                return
+
+        buffer = self._getPreviewBuffer()
+        if vim.current.buffer != buffer:
+            lfCmd("hide buffer %d" % buffer.number)
+        buffer[:] = lines
+        if not match:
+            syntax = self._getPreviewSyntax(file)
+        if lfEval("&syntax") != syntax:
+            lfCmd("setlocal syntax=%s" % (syntax if syntax else "OFF"))
+        vim.current.window.cursor = (min(line_num - start + 1, len(buffer)), 0)
+        lfCmd("norm! zz")
+
+    def _restoreOrigBuffer(self):
+        """
+        show the original buffer in the original window again if
+        the preview buffer is shown in it
+        """
+        if self._preview_buffer is None:
+            return
+
+        orig_pos = self._getInstance().getOriginalPos()
+        if not orig_pos[1].valid or orig_pos[1].buffer != self._preview_buffer:
+            return
+
+        cur_pos = (vim.current.tabpage, vim.current.window)
+        saved_eventignore = vim.options['eventignore']
+        vim.options['eventignore'] = 'all'
+        try:
+            vim.current.tabpage, vim.current.window = orig_pos[:2]
+            if orig_pos[2].valid:
+                vim.current.buffer = orig_pos[2]
+        finally:
+            vim.current.tabpage, vim.current.window = cur_pos
+            vim.options['eventignore'] = saved_eventignore
 
     def _previewResult(self, preview):
         if not self._needPreview(preview):
@@ -541,7 +643,7 @@ class RgExplManager(Manager):
         vim.options['eventignore'] = 'BufLeave,WinEnter,BufEnter'
         try:
             vim.current.tabpage, vim.current.window = orig_pos[:2]
-            self._acceptSelection(line)
+            self._previewSnippet(line)
         finally:
             vim.current.tabpage, vim.current.window, vim.current.buffer = cur_pos
             vim.options['eventignore'] = saved_eventignore
@@ -562,24 +664,7 @@ class RgExplManager(Manager):
         one of files or directories in `markers`.
         `markers` is a list of file or directory names.
         """
-        if os.name == 'nt':
-            # e.g. C:\\
-            root = os.path.splitdrive(os.path.abspath(path))[0] + os.sep
-        else:
-            root = '/'
-
-        path = os.path.abspath(path)
-        while path != root:
-            for name in markers:
-                if os.path.exists(os.path.join(path, name)):
-                    return path
-            path = os.path.abspath(os.path.join(path, ".."))
-
-        for name in markers:
-            if os.path.exists(os.path.join(path, name)):
-                return path
-
-        return ""
+        return rootResolver.nearestAncestor(markers, path)
 
     def startExplorer(self, win_pos, *args, **kwargs):
         self._orig_cwd = os.getcwd()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import os.path
+import time
+
+
+#*****************************************************
+# RootResolver
+#*****************************************************
+class RootResolver(object):
+    """
+    Find the nearest ancestor directory that contains a root marker, e.g.,
+    .git, shared by LeaderfFile and Leaderf rg.
+    The results are memoized per directory and markers, a result younger
+    than `ttl` seconds is returned at once, an older one is returned after
+    checking that none of the directories walked through is modified, i.e.,
+    no marker is created or removed in them, and that the marker found
+    still exists.
+    A directory modified within `granularity` seconds before the walk may be
+    modified again without its mtime changing, so such a result is not
+    trusted after `ttl`, the directories are walked again.
+    """
+    def __init__(self, ttl=5.0, max_size=1000, granularity=2.0):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._granularity = granularity
+        # {(markers, path, dir_only): (time, [(dir, mtime), ...], result, marker, settled)}
+        self._memo = {}
+
+    def _getMtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _isSettled(self, dirs, now):
+        for dir, mtime in dirs:
+            if mtime is not None and now - mtime <= self._granularity:
+                return False
+        return True
+
+    def _isUnchanged(self, dirs):
+        for dir, mtime in dirs:
+            if self._getMtime(dir) != mtime:
+                return False
+        return True
+
+    def _walk(self, markers, path, dir_only):
+        """
+        return a tuple ([(dir, mtime), ...], result, marker), where the list is
+        the directories walked through with their mtime, and `marker` is the
+        path of the marker found, None if there is none
+        """
+        if dir_only:
+            exists = os.path.isdir
+        else:
+            exists = os.path.exists
+
+        if os.name == 'nt':
+            # e.g. C:\\
+            root = os.path.splitdrive(path)[0] + os.sep
+        else:
+            root = '/'
+
+        dirs = []
+        while True:
+            dirs.append((path, self._getMtime(path)))
+            for name in markers:
+                marker = os.path.join(path, name)
+                if exists(marker):
+                    return (dirs, path, marker)
+            if path == root:
+                return (dirs, "", None)
+            parent = os.path.abspath(os.path.join(path, ".."))
+            if parent == path:
+                return (dirs, "", None)
+            path = parent
+
+    def nearestAncestor(self, markers, path, dir_only=False):
+        """
+        return the nearest ancestor path(including itself) of `path` that contains
+        one of files or directories in `markers`, "" if there is none.
+        `markers` is a list of file or directory names.
+        If `dir_only` is True, only the directories in `markers` are considered.
+        """
+        path = os.path.abspath(path)
+        key = (tuple(markers), path, dir_only)
+        now = time.time()
+        entry = self._memo.get(key)
+        if entry is not None:
+            walk_time, dirs, result, marker, settled = entry
+            if now - walk_time < self._ttl:
+                return result
+            exists = os.path.isdir if dir_only else os.path.exists
+            if settled and self._isUnchanged(dirs) and (marker is None or exists(marker)):
+                self._memo[key] = (now, dirs, result, marker, settled)
+                return result
+
+        dirs, result, marker = self._walk(markers, path, dir_only)
+        if len(self._memo) >= self._max_size:
+            self._memo.clear()
+        self._memo[key] = (now, dirs, result, marker, self._isSettled(dirs, now))
+        return result
+
+    def exists(self, path, name):
+        """
+        return True if directory `name` exists in `path` or its ancestor path,
+        otherwise return False
+        """
+        return self.nearestAncestor([name], path, True) != ""
+
+    def clear(self):
+        self._memo.clear()
+
+
+#*****************************************************
+# rootResolver is a singleton
+#*****************************************************
+rootResolver = RootResolver()
+
+__all__ = ['rootResolver']
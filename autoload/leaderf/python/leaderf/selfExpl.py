@@ -124,10 +124,10 @@ class SelfExplManager(Manager):
 
     def _afterEnter(self):
         super(SelfExplManager, self)._afterEnter()
-        id = int(lfEval('''matchadd('Lf_hl_selfIndex', '^\d\+')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_selfDescription', ' \zs".*"$')'''))
-        self._match_ids.append(id)
+        self._match_ids.extend(self._addMatches([
+                ('Lf_hl_selfIndex', r'^\d\+'),
+                ('Lf_hl_selfDescription', r' \zs".*"$'),
+                ]))
 
     def _beforeExit(self):
         super(SelfExplManager, self)._beforeExit()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import os.path
+import mmap
+import stat
+from collections import OrderedDict
+from .utils import *
+
+
+#*****************************************************
+# SnippetReader
+#*****************************************************
+class SnippetReader(object):
+    """
+    Read a window of lines of a file for the preview, only the bytes of
+    those lines are read.
+    The byte offsets of the lines of the recently previewed files are
+    indexed, the index of a file is extended on demand and dropped when
+    the mtime or the size of the file changes. The recently read snippets
+    are cached as well, both caches are LRU.
+    """
+    def __init__(self, max_files=32, max_snippets=256):
+        self._max_files = max_files
+        self._max_snippets = max_snippets
+        # {file: [mtime, size, offsets, complete]}, offsets[i] is the offset of line i+1
+        self._offsets = OrderedDict()
+        # {(file, mtime, size, start, count): lines}
+        self._snippets = OrderedDict()
+
+    def _touch(self, cache, key, value, max_size):
+        cache.pop(key, None)
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+    def _getOffsets(self, file, st, last_line):
+        """
+        return the list of the offsets of the lines of `file`,
+        it covers at least the first `last_line` + 1 lines unless the file is shorter
+        """
+        entry = self._offsets.get(file)
+        if entry is None or entry[0] != st.st_mtime or entry[1] != st.st_size:
+            entry = [st.st_mtime, st.st_size, [0], st.st_size == 0]
+
+        offsets = entry[2]
+        if not entry[3] and len(offsets) <= last_line:
+            with open(file, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    pos = offsets[-1]
+                    while len(offsets) <= last_line:
+                        pos = mm.find(b'\n', pos)
+                        if pos == -1 or pos + 1 == st.st_size:
+                            entry[3] = True
+                            break
+                        pos += 1
+                        offsets.append(pos)
+                finally:
+                    mm.close()
+
+        self._touch(self._offsets, file, entry, self._max_files)
+        return offsets
+
+    def read(self, file, line_num, count, encoding=None):
+        """
+        return a tuple (start, lines), where `lines` are at most `count` lines
+        of `file` around line `line_num`, and `start` is the line number of the
+        first of them.
+        raise OSError or IOError if `file` can not be read or is not a regular file.
+        """
+        st = os.stat(file)
+        if not stat.S_ISREG(st.st_mode):    # mmap can not map it
+            raise IOError("%s is not a regular file" % file)
+
+        start = max(line_num - count // 2, 1)
+        offsets = self._getOffsets(file, st, start + count)
+        if start > len(offsets):    # the file is shorter than expected
+            start = max(len(offsets) - count + 1, 1)
+
+        key = (file, st.st_mtime, st.st_size, start, count)
+        lines = self._snippets.get(key)
+        if lines is not None:
+            self._touch(self._snippets, key, lines, self._max_snippets)
+            return (start, lines)
+
+        begin = offsets[start - 1]
+        if start - 1 + count < len(offsets):
+            end = offsets[start - 1 + count]
+        else:
+            end = st.st_size
+
+        with open(file, 'rb') as f:
+            f.seek(begin)
+            data = f.read(end - begin)
+
+        if data.endswith(b'\n'):
+            data = data[:-1]
+        lines = [line.rstrip('\r') for line in lfBytes2Str(data, encoding).split('\n')]
+
+        self._touch(self._snippets, key, lines, self._max_snippets)
+        return (start, lines)
+
+    def clear(self):
+        self._offsets.clear()
+        self._snippets.clear()
+
+
+#*****************************************************
+# snippetReader is a singleton
+#*****************************************************
+snippetReader = SnippetReader()
+
+__all__ = ['snippetReader']
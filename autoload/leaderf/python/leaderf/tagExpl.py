@@ -4,49 +4,209 @@
 import vim
 import re
 import os
+import sys
+import mmap
+import locale
 import os.path
+import itertools
 from .utils import *
+from .config import *
 from .explorer import *
 from .manager import *
 
 
+#*****************************************************
+# TagFile
+#*****************************************************
+class TagFile(object):
+    """
+    A tags file, it is read through mmap and only read again if it is changed.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._stat = None
+        self._sorted = 0        # the value of !_TAG_FILE_SORTED
+        self._header_len = 0
+        self._tags = []
+        if sys.version_info >= (3, 0):
+            self._encoding = locale.getdefaultlocale()[1] or 'utf-8'
+
+    def _getStat(self):
+        st = os.stat(self._name)
+        return (st.st_mtime, st.st_size)
+
+    def isChanged(self):
+        try:
+            return self._getStat() != self._stat
+        except OSError:
+            return True
+
+    def _decode(self, bytes):
+        if sys.version_info >= (3, 0):
+            return bytes.decode(self._encoding, 'ignore')
+        else:
+            return bytes
+
+    def _splitLines(self, bytes):
+        lines = self._decode(bytes).split('\n')
+        if lines[-1] == '':
+            del lines[-1]
+        if lines and '\r' in lines[0]:
+            lines = [line.rstrip('\r') for line in lines]
+        return lines
+
+    def _readHeader(self, mm):
+        """
+        parse the lines beginning with !_TAG_, return the offset of the first tag
+        """
+        pos = 0
+        self._sorted = 0
+        while mm[pos:pos+6] == b'!_TAG_':
+            end = mm.find(b'\n', pos)
+            if end == -1:
+                end = len(mm)
+            if mm[pos:pos+18] == b'!_TAG_FILE_SORTED\t':
+                self._sorted = int(mm[pos+18:pos+19] or 0)
+            pos = end + 1
+        return pos
+
+    def load(self, chunk_size=1<<24):
+        """
+        read the tags file chunk by chunk, so that only a chunk of the file
+        is in memory at a time besides the tags
+        """
+        self._stat = self._getStat()
+        self._tags = []
+        if self._stat[1] == 0:
+            return self._tags
+
+        with open(self._name, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                size = len(mm)
+                pos = self._header_len = self._readHeader(mm)
+                while pos < size:
+                    end = mm.find(b'\n', min(pos + chunk_size, size - 1))
+                    end = size if end == -1 else end + 1
+                    self._tags.extend(self._splitLines(mm[pos:end]))
+                    pos = end
+            finally:
+                mm.close()
+
+        return self._tags
+
+    def getTags(self):
+        return self._tags
+
+    def searchPrefix(self, prefix, ignorecase):
+        """
+        find the tags whose names start with `prefix` using binary search,
+        return None if the tags file is not sorted in the way required
+        """
+        if self._sorted != (2 if ignorecase else 1):
+            return None
+
+        if sys.version_info >= (3, 0):
+            prefix = prefix.encode(self._encoding, 'ignore')
+        if ignorecase:
+            prefix = prefix.upper()
+
+        if self._stat[1] == 0:
+            return []
+
+        with open(self._name, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                def tagname(start):
+                    eol = mm.find(b'\n', start)
+                    if eol == -1:
+                        eol = size
+                    tab = mm.find(b'\t', start, eol)
+                    # a malformed or truncated line, take the whole line as the tagname
+                    name = mm[start:eol].rstrip(b'\r') if tab == -1 else mm[start:tab]
+                    return name.upper() if ignorecase else name
+
+                size = len(mm)
+                low = self._header_len
+                high = size
+                # find the first line whose tagname >= prefix
+                while low < high:
+                    mid = (low + high) // 2
+                    start = mm.rfind(b'\n', low, mid) + 1 or low
+                    if tagname(start) < prefix:
+                        end = mm.find(b'\n', start)
+                        low = size if end == -1 else end + 1
+                    else:
+                        high = start
+
+                end = low
+                while end < size and tagname(end).startswith(prefix):
+                    end = mm.find(b'\n', end)
+                    end = size if end == -1 else end + 1
+
+                if end == low:
+                    return []
+                return self._splitLines(mm[low:end])
+            finally:
+                mm.close()
+
+
 #*****************************************************
 # TagExplorer
 #*****************************************************
 class TagExplorer(Explorer):
     def __init__(self):
         self._tag_list = []
-        self._file_tags = {}    # a dict with (key, value) = (tag file name, [mtime,taglist])
+        self._tag_files = {}    # a dict with (key, value) = (tag file name, TagFile)
+        self._tag_names = []    # the names of the tags files in the order of tagfiles()
 
     def getContent(self, *args, **kwargs):
         return self.getFreshContent(*args, **kwargs)
 
     def getFreshContent(self, *args, **kwargs):
-        has_new_tagfile = False
-        has_changed_tagfile = False
-        filenames = [name for name in self._file_tags]
+        tag_names = []
         for tagfile in vim.eval("tagfiles()"):
             tagfile = os.path.abspath(tagfile)
-            mtime = os.path.getmtime(tagfile)
-            if tagfile not in self._file_tags:
-                has_new_tagfile = True
-                with lfOpen(tagfile, 'r', errors='ignore') as f:
-                    self._file_tags[tagfile] = [mtime, f.readlines()[6:]]
-            else:
-                filenames.remove(tagfile)
-                if mtime != self._file_tags[tagfile][0]:
-                    has_changed_tagfile = True
-                    with lfOpen(tagfile, 'r', errors='ignore') as f:
-                        self._file_tags[tagfile] = [mtime, f.readlines()[6:]]
+            if tagfile in tag_names:
+                continue
 
-        for name in filenames:
-            del self._file_tags[name]
+            if tagfile not in self._tag_files:
+                self._tag_files[tagfile] = TagFile(tagfile)
 
-        if has_new_tagfile == False and has_changed_tagfile == False:
-            return self._tag_list
-        else:
-            self._tag_list = list(itertools.chain.from_iterable((i[1] for i in self._file_tags.values())))
-            return self._tag_list
+            if self._tag_files[tagfile].isChanged():
+                try:
+                    self._tag_files[tagfile].load()
+                except (IOError, OSError, ValueError):   # e.g., it is deleted
+                    del self._tag_files[tagfile]
+                    continue
+                self._tag_names = None  # the content is changed
+
+            tag_names.append(tagfile)
+
+        for name in set(self._tag_files) - set(tag_names):
+            del self._tag_files[name]
+
+        if tag_names != self._tag_names:
+            self._tag_names = tag_names
+            self._tag_list = list(itertools.chain.from_iterable((self._tag_files[name].getTags()
+                                        for name in self._tag_names)))
+        return self._tag_list
+
+    def searchPrefix(self, prefix, ignorecase):
+        """
+        return the tags whose names start with `prefix` in the order of
+        the content, None if some of the tags files are not sorted
+        """
+        result = []
+        for name in self._tag_names:
+            try:
+                tags = self._tag_files[name].searchPrefix(prefix, ignorecase)
+            except (IOError, OSError, ValueError):
+                return None
+            if tags is None:
+                return None
+            result.extend(tags)
+        return result
 
     def getStlCategory(self):
         return 'Tag'
@@ -133,6 +293,26 @@ class TagExplManager(Manager):
         """
         return 0
 
+    def _regexSearch(self, content, is_continue, step):
+        """
+        if the pattern is a plain prefix, e.g., ^foo_bar, look up the sorted
+        tags files with binary search instead of matching every tag
+        """
+        result = None
+        match = re.match(r'\^([0-9A-Za-z_]+)$', self._cli.pattern)
+        if match:
+            result = self._getExplorer().searchPrefix(match.group(1),
+                                                      lfConfig.ignorecase)
+        if result is None:
+            super(TagExplManager, self)._regexSearch(content, is_continue, step)
+            return
+
+        self._index = len(content)
+        self._cb_content = []
+        self._result_content = result
+        self._getInstance().setBuffer(self._result_content[:self._initial_count])
+        self._getInstance().setStlResultsCount(len(self._result_content))
+
     def _createHelp(self):
         help = []
         help.append('" <CR>/<double-click>/o : open file under cursor')
@@ -148,14 +328,11 @@ class TagExplManager(Manager):
 
     def _afterEnter(self):
         super(TagExplManager, self)._afterEnter()
-        id = int(lfEval('''matchadd('Lf_hl_tagFile', '^.\{-}\t\zs.\{-}\ze\t')'''))
-        self._match_ids.append(id)
-        id = int(lfEval('''matchadd('Lf_hl_tagType', ';"\t\zs[cdefFgmpstuv]\ze\(\t\|$\)')'''))
-        self._match_ids.append(id)
         keyword = ["namespace", "class", "enum", "file", "function", "kind", "struct", "union"]
-        for i in keyword:
-            id = int(lfEval('''matchadd('Lf_hl_tagKeyword', '\(;"\t.\{-}\)\@<=%s:')''' % i))
-            self._match_ids.append(id)
+        self._match_ids.extend(self._addMatches([
+                ('Lf_hl_tagFile', r'^.\{-}\t\zs.\{-}\ze\t'),
+                ('Lf_hl_tagType', r';"\t\zs[cdefFgmpstuv]\ze\(\t\|$\)'),
+                ] + [('Lf_hl_tagKeyword', r'\(;"\t.\{-}\)\@<=%s:' % i) for i in keyword]))
 
     def _beforeExit(self):
         super(TagExplManager, self)._beforeExit()
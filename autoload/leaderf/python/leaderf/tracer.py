@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+from collections import deque
+from .utils import *
+
+
+#*****************************************************
+# Span
+#*****************************************************
+class Span(object):
+    """
+    A stage of a trace, the duration and the numbers of the calls of
+    lfCmd() and lfEval() are recorded when the `with` block exits.
+    The `with` statement returns a dict, the items added to it are
+    recorded as the arguments of the stage, e.g., the number of results.
+    """
+    def __init__(self, trace, name, args):
+        self._trace = trace
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        # the stages are kept in the order they begin
+        self._index = len(self._trace["stages"])
+        self._trace["stages"].append(None)
+        self._start = time.time()
+        self._cmd_count, self._eval_count = lfCallCounts
+        return self._args
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._args["cmd"] = lfCallCounts[0] - self._cmd_count
+        self._args["eval"] = lfCallCounts[1] - self._eval_count
+        self._trace["stages"][self._index] = (self._name, self._start,
+                                              time.time() - self._start, self._args)
+        return False
+
+
+class NullSpan(object):
+    """
+    The span returned if tracing is disabled or no trace is in progress.
+    """
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+#*****************************************************
+# Tracer
+#*****************************************************
+class Tracer(object):
+    """
+    Trace the latency from a keystroke to the redrawn result list.
+    A trace is begun when LfCli.input() gets a key and ended when the prompt
+    is redrawn, the stages in between, e.g., Manager._search, Manager._filter,
+    LfInstance.setBuffer, are recorded with their durations, the numbers of
+    candidates and the round trips to vim.
+    The latest g:Lf_TracingSize traces are kept in a ring buffer.
+    """
+    def __init__(self):
+        self._enabled = lfEval("g:Lf_Tracing") == '1'
+        self._traces = deque(maxlen=max(int(lfEval("g:Lf_TracingSize")), 1))
+        self._trace = None
+        self._null_span = NullSpan()
+
+    def isEnabled(self):
+        return self._enabled
+
+    def begin(self):
+        """
+        begin the trace of a keystroke, the unfinished trace, if any, is dropped
+        """
+        if not self._enabled:
+            return
+
+        self._trace = {
+                "start": time.time(),
+                "cmd": lfCallCounts[0],
+                "eval": lfCallCounts[1],
+                "args": {},
+                "stages": []
+                }
+        self._last_mark = self._trace["start"]
+
+    def mark(self, name, **args):
+        """
+        record a stage from the last mark, or the beginning of the trace, to now,
+        `args` are also recorded as the arguments of the trace
+        """
+        if self._trace is None:
+            return
+
+        now = time.time()
+        self._trace["args"].update(args)
+        self._trace["stages"].append((name, self._last_mark, now - self._last_mark, args))
+        self._last_mark = now
+
+    def span(self, name, **args):
+        """
+        return a context manager that records the stage `name`
+        """
+        if self._trace is None:
+            return self._null_span
+
+        return Span(self._trace, name, args)
+
+    def end(self):
+        """
+        end the trace in progress and save it into the ring buffer
+        """
+        trace = self._trace
+        if trace is None:
+            return
+
+        self._trace = None
+        trace["duration"] = time.time() - trace["start"]
+        trace["cmd"] = lfCallCounts[0] - trace["cmd"]
+        trace["eval"] = lfCallCounts[1] - trace["eval"]
+        self._traces.append(trace)
+
+    def clear(self):
+        self._traces.clear()
+        self._trace = None
+
+    def getSummary(self, count=10):
+        """
+        return a list of lines that summarize the traces in the ring buffer,
+        the statistics of each stage followed by the latest `count` traces
+        """
+        stats = {}
+        for trace in self._traces:
+            for name, _, duration, _ in trace["stages"]:
+                stat = stats.setdefault(name, [0, 0.0, 0.0])
+                stat[0] += 1
+                stat[1] += duration
+                stat[2] = max(stat[2], duration)
+
+        lines = ["%-24s %8s %10s %10s" % ("stage", "calls", "avg(ms)", "max(ms)")]
+        for name, (calls, total, longest) in sorted(stats.items(), key=lambda x: x[1][1], reverse=True):
+            lines.append("%-24s %8d %10.2f %10.2f" % (name, calls, total * 1000 / calls, longest * 1000))
+
+        lines.append("")
+        lines.append("%-10s %-16s %10s %6s %6s" % ("key", "pattern", "total(ms)", "cmd", "eval"))
+        for trace in list(self._traces)[-count:]:
+            args = trace["args"]
+            lines.append("%-10s %-16s %10.2f %6d %6d" % (args.get("key", ""), args.get("pattern", ""),
+                                                        trace["duration"] * 1000,
+                                                        trace["cmd"], trace["eval"]))
+            for name, _, duration, stage_args in trace["stages"]:
+                lines.append("    %-20s %10.2f  %s" % (name, duration * 1000,
+                             " ".join("%s=%s" % i for i in sorted(stage_args.items()))))
+        return lines
+
+    def show(self):
+        if not self._enabled:
+            lfCmd("echohl WarningMsg | echo 'Tracing is disabled, "
+                  "add `let g:Lf_Tracing = 1` to your vimrc to enable it.' | echohl None")
+            return
+
+        if not self._traces:
+            lfCmd("echo 'No traces yet.'")
+            return
+
+        for line in self.getSummary():
+            lfCmd("echo '%s'" % escQuote(line))
+
+    def getChromeTrace(self):
+        """
+        return the traces in the Chrome Trace Event Format,
+        which can be loaded in chrome://tracing or https://ui.perfetto.dev
+        """
+        pid = os.getpid()
+        events = []
+        for trace in self._traces:
+            args = dict(trace["args"], cmd=trace["cmd"], eval=trace["eval"])
+            events.append({"name": "keystroke %s" % args.get("key", ""), "cat": "leaderf",
+                           "ph": "X", "ts": int(trace["start"] * 1e6),
+                           "dur": int(trace["duration"] * 1e6),
+                           "pid": pid, "tid": 0, "args": args})
+            for name, start, duration, stage_args in trace["stages"]:
+                events.append({"name": name, "cat": "leaderf", "ph": "X",
+                               "ts": int(start * 1e6), "dur": int(duration * 1e6),
+                               "pid": pid, "tid": 0, "args": stage_args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, file_name):
+        """
+        write the traces to `file_name` in the Chrome Trace Event Format
+        """
+        try:
+            with lfOpen(lfDecode(os.path.expanduser(file_name)), 'w', errors='ignore') as f:
+                json.dump(self.getChromeTrace(), f)
+        except IOError as e:
+            lfPrintError(e)
+            return
+
+        lfCmd("echo '%d traces are written to %s'" % (len(self._traces), escQuote(file_name)))
+
+
+#*****************************************************
+# tracer is a singleton
+#*****************************************************
+tracer = Tracer()
+
+__all__ = ['tracer']
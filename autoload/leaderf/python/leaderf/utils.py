@@ -7,9 +7,25 @@ import re
 import os
 import os.path
 import locale
+import unicodedata
 
-lfCmd = vim.command
-lfEval = vim.eval
+# the number of the calls of lfCmd() and lfEval(), they are counted only if
+# g:Lf_Tracing is 1, so that the round trips to vim can be traced
+lfCallCounts = [0, 0]
+
+if vim.eval("get(g:, 'Lf_Tracing', 0)") == '1':
+
+    def lfCmd(cmd):
+        lfCallCounts[0] += 1
+        return vim.command(cmd)
+
+    def lfEval(expr):
+        lfCallCounts[1] += 1
+        return vim.eval(expr)
+
+else:
+    lfCmd = vim.command
+    lfEval = vim.eval
 
 if sys.version_info >= (3, 0):
 
@@ -142,5 +158,220 @@ def lfWinId(winnr, tab=None):
     else:
         return None
 
+def lfGetBufferInfo(buf_numbers=None):
+    """
+    return a dict with (key, value) = (buffer number, (changedtick, filetype, modified))
+    of the loaded buffers that have a name, the information of all the buffers
+    is got in a single vim call
+    Args:
+        buf_numbers: a list of buffer numbers, None means all the listed buffers
+    """
+    if buf_numbers is None:
+        buf_numbers = "filter(range(1, bufnr('$')), 'buflisted(v:val)')"
+    info = lfEval("map(filter(%s, 'bufloaded(v:val) && bufname(v:val) != \"\"'),"
+                  " '[v:val, getbufvar(v:val, \"changedtick\"), getbufvar(v:val, \"&filetype\"),"
+                  " getbufvar(v:val, \"&modified\")]')" % str(buf_numbers))
+    return {int(i[0]): (int(i[1]), i[2], i[3] == '1') for i in info}
+
+_control_chars = re.compile('[\x00-\x1f\x7f]')
+
+def lfDisplayWidth(str, ambiwidth=1, tabstop=8, encoding=None):
+    """
+    return the number of display cells `str` occupies, the same as what
+    strdisplaywidth() returns, but without a round trip to vim
+    Args:
+        ambiwidth: the width of the East Asian Ambiguous characters,
+                   2 if &ambiwidth is "double", otherwise 1
+        tabstop: the width of a <Tab>
+        encoding: the value of &encoding, only used by Python 2 to decode `str`
+    """
+    if not _control_chars.search(str):
+        try:
+            str.encode('ascii')
+            return len(str)
+        except UnicodeError:
+            pass
+
+    if sys.version_info < (3, 0):
+        str = str.decode(encoding or lfEval("&encoding"), 'ignore')
+
+    width = 0
+    for c in str:
+        if c == '\t':
+            width += tabstop - width % tabstop
+        elif c < ' ' or c == '\x7f':
+            # displayed as ^X
+            width += 2
+        elif c < '\x7f':
+            width += 1
+        elif c <= '\x9f':
+            # displayed as <80>
+            width += 4
+        elif unicodedata.combining(c):
+            continue
+        else:
+            eaw = unicodedata.east_asian_width(c)
+            if eaw in ('W', 'F'):
+                width += 2
+            elif eaw == 'A':
+                width += ambiwidth
+            else:
+                width += 1
+    return width
+
+def lfAmbiwidth():
+    return 2 if lfEval("&ambiwidth") == "double" else 1
+
 def lfPrintError(error):
     lfCmd("echohl Error | redraw | echo '%s' | echohl None" % escQuote(str(error)))
+
+# the character classes of vim regex that have an equivalent in python
+_vim_char_classes = {
+    's': '[ \\t]', 'S': '[^ \\t]',
+    'd': '[0-9]', 'D': '[^0-9]',
+    'w': '[0-9A-Za-z_]', 'W': '[^0-9A-Za-z_]',
+    'h': '[A-Za-z_]', 'H': '[^A-Za-z_]',
+    'a': '[A-Za-z]', 'A': '[^A-Za-z]',
+    'l': '[a-z]', 'L': '[^a-z]',
+    'u': '[A-Z]', 'U': '[^A-Z]',
+    'x': '[0-9A-Fa-f]', 'X': '[^0-9A-Fa-f]',
+    'o': '[0-7]', 'O': '[^0-7]',
+    'n': '\\n', 't': '\\t', 'r': '\\r', 'e': '\\x1b',
+    '<': '(?<![0-9A-Za-z_])(?=[0-9A-Za-z_])',
+    '>': '(?<=[0-9A-Za-z_])(?![0-9A-Za-z_])',
+}
+
+def lfTranslateRegex(regex):
+    """
+    translate a 'magic' vim regex to python regex, only whether a match exists
+    is considered, so \\zs and \\ze are dropped.
+    return a tuple (python regex, ignorecase), where ignorecase is True for \\c,
+    False for \\C, otherwise None.
+    return None if `regex` uses a construct that can not be translated.
+    """
+    result = []
+    ignorecase = None
+    length = len(regex)
+    # whether there is an atom for a multi, e.g., `*`, to apply to
+    has_atom = False
+    i = 0
+    while i < length:
+        c = regex[i]
+        i += 1
+        if c == '\\':
+            if i == length:
+                return None
+            c = regex[i]
+            i += 1
+            if c in '+=?':
+                if not has_atom:
+                    return None
+                result.append('+' if c == '+' else '?')
+                has_atom = False
+            elif c == '{':
+                if not has_atom:
+                    return None
+                end = regex.find('}', i)
+                if end == -1:
+                    return None
+                m = re.match(r'(-?)(\d*)(,?)(\d*)\\?$', regex[i:end])
+                if m is None:
+                    return None
+                i = end + 1
+                non_greedy, low, comma, high = m.groups()
+                if comma:
+                    multi = '{%s,%s}' % (low or '0', high)
+                elif low:
+                    multi = '{%s}' % low
+                else:
+                    multi = '*'
+                result.append(multi + ('?' if non_greedy else ''))
+                has_atom = False
+            elif c == '(':
+                result.append('(')
+                has_atom = False
+                if regex.startswith('^', i):
+                    result.append('^')
+                    i += 1
+            elif c == ')':
+                result.append(')')
+                has_atom = True
+            elif c == '|':
+                result.append('|')
+                has_atom = False
+                if regex.startswith('^', i):
+                    result.append('^')
+                    i += 1
+            elif c == 'z' and i < length and regex[i] in 'se':
+                i += 1
+            elif c == 'c':
+                ignorecase = True
+            elif c == 'C':
+                ignorecase = False if ignorecase is None else ignorecase
+            elif c in '123456789':
+                result.append('\\' + c)
+                has_atom = True
+            elif c in _vim_char_classes:
+                result.append(_vim_char_classes[c])
+                has_atom = c not in '<>'
+            elif c in '\\.*[]~/^$':
+                result.append(re.escape(c))
+                has_atom = True
+            else:
+                # \%, \@, \_, \v, \V, \&, \{-} etc.
+                return None
+        elif c == '[':
+            end = i
+            if end < length and regex[end] == '^':
+                end += 1
+            if end < length and regex[end] == ']':
+                end += 1
+            while end < length and regex[end] != ']':
+                if regex[end] == '\\':
+                    end += 1
+                elif regex[end] == '[' and regex[end+1:end+2] in (':', '=', '.'):
+                    return None
+                end += 1
+            if end >= length:
+                # no matching ']', '[' is taken literally
+                result.append('\\[')
+            else:
+                body = regex[i:end]
+                if re.search(r'\\[doxuUb]', body):
+                    return None
+                # in vim, a backslash in [] escapes only some characters
+                body = re.sub(r'\\([^\\\]^\-etrn])', r'\\\\\1', body)
+                body = body.replace('\\e', '\\x1b')
+                body = re.sub(r'([\[&~|])', r'\\\1', body)
+                result.append('[' + body + ']')
+                i = end + 1
+            has_atom = True
+        elif c == '*':
+            if has_atom:
+                result.append('*')
+                has_atom = False
+            else:
+                result.append('\\*')
+                has_atom = True
+        elif c == '^':
+            if i == 1:
+                result.append('^')
+            else:
+                result.append('\\^')
+                has_atom = True
+        elif c == '$':
+            if i == length or regex.startswith('\\|', i) or regex.startswith('\\)', i):
+                result.append('$')
+            else:
+                result.append('\\$')
+                has_atom = True
+        elif c == '~':
+            return None
+        elif c == '.':
+            result.append('.')
+            has_atom = True
+        else:
+            result.append(re.escape(c))
+            has_atom = True
+
+    return (''.join(result), ignorecase)
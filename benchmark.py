@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run the benchmarks of the hot paths of LeaderF without vim.
+
+The `vim` module is replaced by a stub, the corpora are generated with a
+fixed seed, and the results are printed as JSON, e.g.,
+
+    python benchmark.py --sizes 10k,100k --output bench_output.txt
+
+Only the benchmarks whose modules are importable are run, so build the C
+extension with install.sh first to include fuzzyMatchC and fuzzyEngine.
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "autoload", "leaderf", "python"))
+
+
+#*****************************************************
+# vim stub
+#*****************************************************
+class VimError(Exception):
+    pass
+
+def installVimStub(cache_dir):
+    """
+    install a module named `vim` that answers the lfEval()s of LeaderF
+    """
+    values = {
+        "&encoding": "utf-8",
+        "&ignorecase": "1",
+        "g:Lf_CacheDirectory": cache_dir,
+        "g:Lf_PythonVersion": str(sys.version_info[0]),
+        "g:Lf_MaxCount": "0",
+        "g:Lf_HighlightIndividual": "1",
+        "g:Lf_NumberOfHighlight": "100",
+        "g:Lf_FuzzyProcessCount": "0",
+        "g:Lf_IndexTimeLimit": "120",
+        "g:Lf_CtagsCacheSize": "0",
+        "exists('*matchaddpos')": "1",
+    }
+
+    def eval(expr):
+        if expr.startswith("matchaddpos("):
+            return "1"
+        if expr.startswith("[") and expr.endswith("]"):    # e.g., the snapshot of LfConfig
+            return [eval(e) for e in expr[1:-1].split(", ")]
+        return values.get(expr, "0")
+
+    vim = types.ModuleType("vim")
+    vim.eval = eval
+    vim.command = lambda cmd: None
+    vim.error = VimError
+    vim.vars = {}
+    vim.options = {}
+    vim.buffers = []
+    sys.modules["vim"] = vim
+
+
+#*****************************************************
+# corpora
+#*****************************************************
+_words = ["src", "lib", "test", "include", "util", "core", "common", "main", "config",
+          "manager", "explorer", "instance", "buffer", "window", "search", "match",
+          "fuzzy", "engine", "parser", "render", "cache", "index", "file", "path"]
+_exts = [".py", ".c", ".h", ".vim", ".txt", ".js", ".go", ".rs", ".md"]
+
+def _name(rand):
+    return "_".join(rand.choice(_words) for _ in range(rand.randint(1, 3)))
+
+def genPaths(size, seed=0):
+    rand = random.Random(seed)
+    return ["/".join(_name(rand) for _ in range(rand.randint(1, 6))) + rand.choice(_exts)
+            for _ in range(size)]
+
+def genRgLines(size, seed=0):
+    rand = random.Random(seed)
+    paths = genPaths(max(size // 50, 1), seed)
+    return ["%s:%d:    %s = %s(%s)" % (rand.choice(paths), rand.randint(1, 5000), _name(rand),
+                                        _name(rand), _name(rand))
+            for _ in range(size)]
+
+def genCtagsLines(size, seed=0):
+    rand = random.Random(seed)
+    paths = genPaths(max(size // 100, 1), seed)
+    return ["%s\t%s\t/^    def %s(self):$/;\"\t%s\tline:%d" % (_name(rand), rand.choice(paths),
+                                                              _name(rand), rand.choice("fmcv"),
+                                                              rand.randint(1, 5000))
+            for _ in range(size)]
+
+def parseSize(size):
+    size = size.strip().lower()
+    for suffix, unit in (("k", 1000), ("m", 1000000)):
+        if size.endswith(suffix):
+            return int(float(size[:-1]) * unit)
+    return int(size)
+
+
+#*****************************************************
+# benchmarks
+#*****************************************************
+class Benchmark(object):
+    def __init__(self, repeat):
+        self._repeat = repeat
+        self.results = []
+
+    def run(self, name, size, func, **extra):
+        """
+        run `func` `repeat` times and record the best time
+        """
+        best = None
+        for _ in range(self._repeat):
+            start = time.time()
+            func()
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        result = {"name": name, "size": size, "seconds": round(best, 6),
+                  "ns_per_item": round(best * 1e9 / max(size, 1), 1)}
+        result.update(extra)
+        self.results.append(result)
+        sys.stderr.write("%-60s %10d %12.6fs\n" % (name + "".join(" %s=%s" % i for i in sorted(extra.items())),
+                                                  size, best))
+
+def benchFuzzyMatch(bench, corpus, pattern):
+    from leaderf.fuzzyMatch import FuzzyMatch
+    fuzzy_match = FuzzyMatch(pattern, "utf-8")
+    for method in ("getWeight", "getWeight2", "getWeight3"):
+        get_weight = getattr(fuzzy_match, method)
+        bench.run("FuzzyMatch." + method, len(corpus), lambda: [get_weight(s) for s in corpus])
+
+def benchFuzzyMatchC(bench, corpus, pattern):
+    try:
+        import fuzzyMatchC
+    except ImportError:
+        return
+    pattern = fuzzyMatchC.initPattern(pattern)
+    for is_name_only in (False, True):
+        bench.run("fuzzyMatchC.getWeight", len(corpus),
+                  lambda: [fuzzyMatchC.getWeight(s, pattern=pattern, is_name_only=is_name_only)
+                           for s in corpus],
+                  is_name_only=is_name_only)
+
+def benchFuzzyEngine(bench, corpus, pattern):
+    try:
+        import fuzzyEngine
+    except ImportError:
+        return
+    pattern = fuzzyEngine.initPattern(pattern)
+    cpu_count = multiprocessing.cpu_count()
+    thread_counts = sorted(set([1, 2, 4, 8, cpu_count]))
+    for threads in thread_counts:
+        engine = fuzzyEngine.createFuzzyEngine(threads, False)
+        try:
+            bench.run("fuzzyEngine.fuzzyMatch", len(corpus),
+                      lambda: fuzzyEngine.fuzzyMatch(engine=engine, source=corpus, pattern=pattern,
+                                                     is_name_only=False, sort_results=True),
+                      threads=threads)
+            bench.run("fuzzyEngine.fuzzyMatchEx", len(corpus),
+                      lambda: fuzzyEngine.fuzzyMatchEx(engine=engine, source=corpus, pattern=pattern,
+                                                       is_name_only=True, sort_results=False),
+                      threads=threads)
+        finally:
+            fuzzyEngine.closeFuzzyEngine(engine)
+
+class _Cli(object):
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.isFuzzy = True
+        self.isFullPath = True
+        self.isAndMode = False
+        self.isRefinement = False
+        self.isPrefix = False
+
+class _Instance(object):
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def empty(self):
+        return len(self.buffer) == 0
+
+    def isReverseOrder(self):
+        return False
+
+def _createManager(pattern):
+    from leaderf.manager import Manager
+    from leaderf.explorer import Explorer
+
+    class BenchExplorer(Explorer):
+        def getContent(self, *args, **kwargs):
+            return []
+
+        def getStlCategory(self):
+            return "File"
+
+    class BenchManager(Manager):
+        def _getExplClass(self):
+            return BenchExplorer
+
+    manager = BenchManager()
+    manager._cli = _Cli(pattern)
+    return manager
+
+def benchManagerFilter(bench, corpus, pattern):
+    from leaderf import manager as manager_module
+    from leaderf.fuzzyMatch import FuzzyMatch
+
+    manager = _createManager(pattern)
+    methods = [("FuzzyMatch", FuzzyMatch(pattern, "utf-8").getWeight2)]
+    if manager_module.is_fuzzyMatch_C:
+        import fuzzyMatchC
+        c_pattern = fuzzyMatchC.initPattern(pattern)
+        methods.append(("fuzzyMatchC", lambda s: fuzzyMatchC.getWeight(s, pattern=c_pattern,
+                                                                        is_name_only=False)))
+
+    for name, get_weight in methods:
+        for step in (2000, 10000, 40000):
+            def run():
+                filter_method = lambda iterable: manager._fuzzyFilter(True, get_weight, iterable)
+                manager._index = 0
+                manager._filter(step, filter_method, corpus, False)
+                while manager._index < len(corpus):
+                    manager._filter(step, filter_method, corpus, True)
+
+            bench.run("Manager._filter", len(corpus), run, matcher=name, step=step)
+
+def benchHighlight(bench, corpus, pattern):
+    from leaderf.fuzzyMatch import FuzzyMatch
+
+    manager = _createManager(pattern)
+    fuzzy_match = FuzzyMatch(pattern, "utf-8")
+    # only the lines that match are highlighted
+    lines = [s for s in corpus if fuzzy_match.getWeight2(s) > FuzzyMatch.MIN_WEIGHT][:100]
+    manager._instance = _Instance(lines)
+    get_highlights = fuzzy_match.getHighlights
+    bench.run("Manager._highlight", len(lines),
+              lambda: manager._highlight(True, get_highlights), matcher="FuzzyMatch")
+
+def benchAsyncExecutor(bench, corpus, tmp_dir):
+    from leaderf.asyncExecutor import AsyncExecutor
+
+    file_name = os.path.join(tmp_dir, "corpus.txt")
+    with open(file_name, "w") as f:
+        for line in corpus:
+            f.write(line + "\n")
+
+    cmd = "type %s" % file_name if os.name == 'nt' else "cat %s" % file_name
+    bench.run("AsyncExecutor", len(corpus),
+              lambda: sum(1 for _ in AsyncExecutor().execute(cmd)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run the benchmarks of LeaderF without vim.")
+    parser.add_argument("--sizes", default="10k,100k",
+                        help="comma separated corpus sizes, e.g., 10k,100k,1m,10m")
+    parser.add_argument("--pattern", default="srcmgrpy", help="the pattern to match")
+    parser.add_argument("--repeat", type=int, default=3, help="run each benchmark this many times")
+    parser.add_argument("--output", help="write the JSON to this file instead of stdout")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="leaderf_bench")
+    try:
+        installVimStub(tmp_dir)
+        bench = Benchmark(args.repeat)
+        for size in [parseSize(s) for s in args.sizes.split(",")]:
+            paths = genPaths(size)
+            rg_lines = genRgLines(size)
+            ctags_lines = genCtagsLines(size)
+
+            for corpus_name, corpus in (("paths", paths), ("rg", rg_lines), ("ctags", ctags_lines)):
+                start = len(bench.results)
+                benchFuzzyMatchC(bench, corpus, args.pattern)
+                benchFuzzyEngine(bench, corpus, args.pattern)
+                if size <= 1000000:     # too slow for larger corpora
+                    benchFuzzyMatch(bench, corpus, args.pattern)
+                for result in bench.results[start:]:
+                    result["corpus"] = corpus_name
+
+            start = len(bench.results)
+            if size <= 1000000:
+                benchManagerFilter(bench, paths, args.pattern)
+            benchHighlight(bench, paths, args.pattern)
+            benchAsyncExecutor(bench, paths, tmp_dir)
+            for result in bench.results[start:]:
+                result["corpus"] = "paths"
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "pattern": args.pattern,
+        "repeat": args.repeat,
+        "results": bench.results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,30 @@ augroup LeaderF_Mru
                 \ call lfMru#recordBuffer(expand('<abuf>'))
 augroup END
 
+let s:Lf_PrewarmDir = ''
+
+" load the file list of the project in the background when the project may change
+function! s:Prewarm(timer)
+    if &buftype != '' || &filetype ==# 'leaderf'
+        return
+    endif
+    let dir = expand('%:p:h')
+    if dir ==# s:Lf_PrewarmDir
+        return
+    endif
+    let s:Lf_PrewarmDir = dir
+    call leaderf#File#prewarm()
+endfunction
+
+if get(g:, 'Lf_Prewarm', 0) == 1 && exists('*timer_start')
+    augroup LeaderF_Prewarm
+        autocmd VimEnter,BufEnter * call timer_start(0, function('s:Prewarm'))
+        if exists('##DirChanged')
+            autocmd DirChanged * let s:Lf_PrewarmDir = '' | call timer_start(0, function('s:Prewarm'))
+        endif
+    augroup END
+endif
+
 noremap <silent> <Plug>LeaderfFileTop        :<C-U>call leaderf#File#startExpl('top')<CR>
 noremap <silent> <Plug>LeaderfFileBottom     :<C-U>call leaderf#File#startExpl('bottom')<CR>
 noremap <silent> <Plug>LeaderfFileLeft       :<C-U>call leaderf#File#startExpl('left')<CR>
@@ -165,6 +189,8 @@ command! -bar -nargs=0 LeaderfColorscheme call leaderf#Colors#startExpl(g:Lf_Win
 command! -bar -nargs=0 LeaderfRgInteractive call leaderf#Rg#Interactive()
 command! -bar -nargs=0 LeaderfRgRecall exec "Leaderf! rg --recall"
 
+command! -bar -nargs=? -bang -complete=file LeaderfProfile call leaderf#Profile#command(<bang>0, <q-args>)
+
 try
     if g:Lf_ShortcutF != ""
         exec 'nnoremap <silent><unique> ' g:Lf_ShortcutF ':<C-U>LeaderfFile<CR>'